@@ -0,0 +1,95 @@
+from functools import cached_property
+
+import librosa
+import numpy as np
+
+# Fundamental frequency range of adult and child speaking voices (Hz)
+VOICE_FMIN = 65
+VOICE_FMAX = 500
+
+
+def pitch_from_piptrack(pitches, magnitudes, sr, hop_length=512, fmin=VOICE_FMIN, fmax=VOICE_FMAX):
+    """Pick the pitch of the strongest bin of every frame with array operations"""
+    frames = np.arange(pitches.shape[1])
+    f0 = pitches[magnitudes.argmax(axis=0), frames]
+
+    # piptrack interpolates around peaks, keep the result inside the voice range
+    f0 = np.where((f0 >= fmin) & (f0 <= fmax), f0, 0.0)
+    times = librosa.frames_to_time(frames, sr=sr, hop_length=hop_length)
+    return f0, times
+
+
+def pitch_contour(f0, times, interval=0.5):
+    """Median voiced f0 every ``interval`` seconds, skipping silent stretches"""
+    if f0.size == 0:
+        return []
+
+    # Pad to whole buckets with NaN so every bucket is one row
+    frame_step = times[1] - times[0] if times.size > 1 else interval
+    per_bucket = max(1, int(round(interval / frame_step)))
+    buckets = int(np.ceil(f0.size / per_bucket))
+
+    voiced = np.full(buckets * per_bucket, np.nan)
+    voiced[:f0.size] = np.where(f0 > 0, f0, np.nan)
+    voiced = voiced.reshape(buckets, per_bucket)
+
+    has_pitch = ~np.all(np.isnan(voiced), axis=1)
+    medians = np.full(buckets, np.nan)
+    medians[has_pitch] = np.nanmedian(voiced[has_pitch], axis=1)
+    bucket_times = times[0] + np.arange(buckets) * per_bucket * frame_step
+
+    return [
+        {'time': round(float(t), 2), 'pitch': round(float(p), 1)}
+        for t, p in zip(bucket_times[has_pitch], medians[has_pitch])
+    ]
+
+
+class SpectralFeatureBank:
+    def __init__(self, y, sr, n_fft=2048, hop_length=512):
+        """Compute the magnitude spectrogram of a signal once and derive every feature from it
+
+        Features are computed on first access and memoized, so unused ones cost nothing.
+        """
+        self.y = y
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.S = np.abs(librosa.stft(y, n_fft=n_fft, hop_length=hop_length))
+
+    @cached_property
+    def times(self):
+        """Time in seconds of every spectrogram frame"""
+        return librosa.frames_to_time(np.arange(self.S.shape[1]), sr=self.sr, hop_length=self.hop_length)
+
+    @cached_property
+    def rms(self):
+        """Energy of every frame"""
+        return librosa.feature.rms(S=self.S, frame_length=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def spectral_centroid(self):
+        """Spectral centroid (Hz) of every frame"""
+        return librosa.feature.spectral_centroid(S=self.S, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def spectral_rolloff(self):
+        """Frequency (Hz) below which 85% of the energy of every frame lies"""
+        return librosa.feature.spectral_rolloff(S=self.S, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def spectral_flatness(self):
+        """Tonality of every frame, from 0 (voiced) to 1 (noise)"""
+        return librosa.feature.spectral_flatness(S=self.S, n_fft=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def zero_crossing_rate(self):
+        """Zero crossing rate of every frame, aligned with the spectrogram frames"""
+        return librosa.feature.zero_crossing_rate(self.y, frame_length=self.n_fft, hop_length=self.hop_length)[0]
+
+    @cached_property
+    def pitch(self):
+        """Per-frame f0 in the voice range (0 where no pitch was found) and frame times"""
+        pitches, magnitudes = librosa.piptrack(
+            S=self.S, sr=self.sr, n_fft=self.n_fft, hop_length=self.hop_length, fmin=VOICE_FMIN, fmax=VOICE_FMAX
+        )
+        return pitch_from_piptrack(pitches, magnitudes, self.sr, self.hop_length)
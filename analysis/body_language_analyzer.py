@@ -1,12 +1,34 @@
-import cv2
 import mediapipe as mp
 import numpy as np
-from collections import deque
-import math
+from utils.frame_source import run_frame_analyzers
+from utils.motion_scheduler import adaptive_cache_key, create_motion_scheduler
+from config import settings
+
+# MediaPipe pose landmark indices
+NOSE = 0
+LEFT_EAR, RIGHT_EAR = 7, 8
+LEFT_SHOULDER, RIGHT_SHOULDER = 11, 12
+LEFT_WRIST, RIGHT_WRIST = 15, 16
+
+# Landmarks whose displacement between frames measures body movement
+MOVEMENT_LANDMARKS = [NOSE, LEFT_WRIST, RIGHT_WRIST, LEFT_SHOULDER, RIGHT_SHOULDER]
+
+# Values stored per landmark: x, y, z, visibility
+POSE_LANDMARKS = 33
+POSE_VALUES = 4
 
 class BodyLanguageAnalyzer:
-    def __init__(self):
+    # Bump when a change alters the results, so cached analyses are recomputed
+    VERSION = 3
+    
+    def __init__(self, sample_rate=None, inference_size=None):
         """Initialize MediaPipe pose detection"""
+        # Frames analyzed per second of video, whatever the source frame rate
+        self.sample_rate = sample_rate or settings.BODY_ANALYSIS_FPS
+        
+        # Pose landmarks are normalized, so inference can run on a downscaled frame
+        self.inference_size = settings.POSE_INFERENCE_SIZE if inference_size is None else inference_size
+        
         self.mp_pose = mp.solutions.pose
         self.pose = self.mp_pose.Pose(
             static_image_mode=False,
@@ -19,194 +41,140 @@ class BodyLanguageAnalyzer:
     
     def analyze(self, video_path):
         """Analyze body language from video"""
-        
+        return run_frame_analyzers(video_path, [self])[0]
+    
+    def cache_key(self):
+        """Version and settings that determine the results of this analyzer"""
+        return f"body-v{self.VERSION}-fps{self.sample_rate}-size{self.inference_size}-{adaptive_cache_key()}"
+    
+    def create_consumer(self):
+        """Create a frame consumer holding the state of one analysis"""
+        return BodyLanguageConsumer(self)
+    
+    def finish_segments(self, states):
+        """Merge the states of consecutive video segments into the final results"""
         try:
-            cap = cv2.VideoCapture(video_path)
-            
-            if not cap.isOpened():
-                raise Exception("No se pudo abrir el video")
-            
-            # Get video properties
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps if fps > 0 else 0
-            
-            # Analysis variables
-            pose_data = []
-            gesture_count = 0
-            movement_history = deque(maxlen=30)  # Last 30 frames for smoothing
-            stability_scores = []
-            
-            frame_count = 0
-            
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Process every 5th frame for efficiency
-                if frame_count % 5 == 0:
-                    results = self._process_frame(frame)
-                    
-                    if results:
-                        pose_data.append(results)
-                        
-                        # Track movement
-                        movement_score = self._calculate_movement(results, movement_history)
-                        movement_history.append(movement_score)
-                        
-                        # Detect gestures
-                        if self._detect_gesture(results):
-                            gesture_count += 1
-                        
-                        # Calculate posture stability
-                        stability = self._calculate_posture_stability(results)
-                        stability_scores.append(stability)
-                
-                frame_count += 1
-            
-            cap.release()
-            
-            # Calculate final metrics
-            analysis_results = self._calculate_body_metrics(
-                pose_data, gesture_count, stability_scores, duration
-            )
-            
-            # Generate feedback
-            feedback = self._generate_body_feedback(analysis_results)
-            
-            return {
-                'score': analysis_results['overall_score'],
-                'posture_stability': analysis_results['posture_stability'],
-                'movement_score': analysis_results['movement_score'],
-                'gesture_count': gesture_count,
-                'movement_timeline': self._create_movement_timeline(pose_data),
-                'feedback': feedback
-            }
-            
+            return self._build_results(self._merge_states(states))
         except Exception as e:
-            return {
-                'score': 0,
-                'posture_stability': 0,
-                'movement_score': 0,
-                'gesture_count': 0,
-                'movement_timeline': [],
-                'feedback': [f"Error en análisis corporal: {str(e)}"]
-            }
+            return self._error_results(e)
+    
+    def _merge_states(self, states):
+        """Concatenate segment states in time order"""
+        # Movement deltas and the timeline are computed on the merged pose
+        # sequence, so the frames on both sides of each boundary are compared
+        states = sorted(states, key=lambda state: state['start_time'])
+        
+        return {
+            'start_time': states[0]['start_time'] if states else 0,
+            'poses': np.concatenate([state['poses'] for state in states]) if states else empty_poses(),
+            'timestamps': np.concatenate([state['timestamps'] for state in states]) if states else np.zeros(0),
+            'duration': states[-1]['duration'] if states else 0
+        }
     
-    def _process_frame(self, frame):
-        """Process single frame for pose detection"""
+    def _build_results(self, state):
+        """Build the final body language results from the collected pose tensor"""
+        poses = state['poses']
+        
+        # Every per-frame measure is computed for all frames at once
+        movement = self._calculate_movement(poses)
+        gestures = self._detect_gestures(poses)
+        stability = self._calculate_posture_stability(poses)
+        gesture_count = int(np.count_nonzero(gestures))
+        
+        # Calculate final metrics
+        analysis_results = self._calculate_body_metrics(
+            len(poses), movement, gesture_count, stability, state['duration']
+        )
+        
+        # Generate feedback
+        feedback = self._generate_body_feedback(analysis_results)
+        
+        return {
+            'score': analysis_results['overall_score'],
+            'posture_stability': analysis_results['posture_stability'],
+            'movement_score': analysis_results['movement_score'],
+            'gesture_count': gesture_count,
+            'movement_timeline': self._create_movement_timeline(state['timestamps'], movement, gestures),
+            'feedback': feedback
+        }
+    
+    def _error_results(self, error):
+        """Build the results returned when the analysis fails"""
+        return {
+            'score': 0,
+            'posture_stability': 0,
+            'movement_score': 0,
+            'gesture_count': 0,
+            'movement_timeline': [],
+            'feedback': [f"Error en análisis corporal: {str(error)}"],
+            'error': str(error)
+        }
+    
+    def _process_frame(self, rgb_frame):
+        """Process single RGB frame (already scaled by the FrameSource) for pose detection
+        
+        Returns the (33, 4) landmarks (x, y, z, visibility) or None if no person was found.
+        """
         
         try:
-            # Convert BGR to RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
             # Process pose
             results = self.pose.process(rgb_frame)
             
             if results.pose_landmarks:
-                # Extract key landmarks
-                landmarks = results.pose_landmarks.landmark
-                
-                return {
-                    'nose': [landmarks[0].x, landmarks[0].y],
-                    'left_shoulder': [landmarks[11].x, landmarks[11].y],
-                    'right_shoulder': [landmarks[12].x, landmarks[12].y],
-                    'left_elbow': [landmarks[13].x, landmarks[13].y],
-                    'right_elbow': [landmarks[14].x, landmarks[14].y],
-                    'left_wrist': [landmarks[15].x, landmarks[15].y],
-                    'right_wrist': [landmarks[16].x, landmarks[16].y],
-                    'left_hip': [landmarks[23].x, landmarks[23].y],
-                    'right_hip': [landmarks[24].x, landmarks[24].y],
-                    'visibility': [l.visibility for l in landmarks]
-                }
+                return np.array(
+                    [(l.x, l.y, l.z, l.visibility) for l in results.pose_landmarks.landmark],
+                    dtype=np.float32
+                )
             
             return None
             
         except Exception:
             return None
     
-    def _calculate_movement(self, current_pose, movement_history):
-        """Calculate movement intensity for current frame"""
-        
-        if not movement_history:
-            return 0
+    def _calculate_movement(self, poses):
+        """Movement of the key points since the previous detected pose, for every frame"""
+        if len(poses) < 2:
+            return np.zeros(len(poses), dtype=np.float32)
         
-        try:
-            # Compare with previous frame
-            prev_pose = movement_history[-1] if movement_history else None
-            
-            if prev_pose is None:
-                return 0
-            
-            # Calculate movement of key points
-            movement = 0
-            key_points = ['nose', 'left_wrist', 'right_wrist', 'left_shoulder', 'right_shoulder']
-            
-            for point in key_points:
-                if point in current_pose and point in prev_pose:
-                    dx = current_pose[point][0] - prev_pose[point][0]
-                    dy = current_pose[point][1] - prev_pose[point][1]
-                    movement += math.sqrt(dx*dx + dy*dy)
-            
-            return movement
-            
-        except Exception:
-            return 0
+        key_points = poses[:, MOVEMENT_LANDMARKS, :2]
+        displacement = np.linalg.norm(np.diff(key_points, axis=0), axis=2).sum(axis=1)
+        return np.concatenate(([0], displacement)).astype(np.float32)
     
-    def _detect_gesture(self, pose_data):
-        """Detect if current pose represents a gesture"""
+    def _detect_gestures(self, poses):
+        """Whether each pose is a gesture: a hand raised above its shoulder or away from the body"""
+        wrists = poses[:, [LEFT_WRIST, RIGHT_WRIST], :2]
+        shoulders = poses[:, [LEFT_SHOULDER, RIGHT_SHOULDER], :2]
         
-        try:
-            # Simple gesture detection based on hand position relative to body
-            left_wrist = pose_data.get('left_wrist', [0, 0])
-            right_wrist = pose_data.get('right_wrist', [0, 0])
-            left_shoulder = pose_data.get('left_shoulder', [0, 0])
-            right_shoulder = pose_data.get('right_shoulder', [0, 0])
-            
-            # Check if hands are raised (above shoulder level)
-            left_raised = left_wrist[1] < left_shoulder[1] - 0.1
-            right_raised = right_wrist[1] < right_shoulder[1] - 0.1
-            
-            # Check if hands are extended (away from body center)
-            body_center_x = (left_shoulder[0] + right_shoulder[0]) / 2
-            left_extended = abs(left_wrist[0] - body_center_x) > 0.2
-            right_extended = abs(right_wrist[0] - body_center_x) > 0.2
-            
-            # Gesture detected if at least one hand is raised or extended
-            return left_raised or right_raised or left_extended or right_extended
-            
-        except Exception:
-            return False
+        # Hands raised above shoulder level (y grows downwards)
+        raised = wrists[:, :, 1] < shoulders[:, :, 1] - 0.1
+        
+        # Hands extended away from the body center
+        body_center_x = shoulders[:, :, 0].mean(axis=1, keepdims=True)
+        extended = np.abs(wrists[:, :, 0] - body_center_x) > 0.2
+        
+        # Gesture detected if at least one hand is raised or extended
+        return (raised | extended).any(axis=1)
     
-    def _calculate_posture_stability(self, pose_data):
-        """Calculate posture stability score"""
+    def _calculate_posture_stability(self, poses):
+        """Posture stability (0-1) of every pose, from shoulder level and head alignment"""
+        left_shoulder = poses[:, LEFT_SHOULDER, :2]
+        right_shoulder = poses[:, RIGHT_SHOULDER, :2]
         
-        try:
-            # Calculate shoulder alignment
-            left_shoulder = pose_data.get('left_shoulder', [0, 0])
-            right_shoulder = pose_data.get('right_shoulder', [0, 0])
-            
-            # Shoulder level difference (should be minimal for good posture)
-            shoulder_diff = abs(left_shoulder[1] - right_shoulder[1])
-            shoulder_stability = max(0, 1 - shoulder_diff * 10)
-            
-            # Head position relative to shoulders
-            nose = pose_data.get('nose', [0, 0])
-            shoulder_center_x = (left_shoulder[0] + right_shoulder[0]) / 2
-            head_alignment = max(0, 1 - abs(nose[0] - shoulder_center_x) * 5)
-            
-            # Overall stability
-            stability = (shoulder_stability + head_alignment) / 2
-            return min(1, max(0, stability))
-            
-        except Exception:
-            return 0.5
+        # Shoulder level difference (should be minimal for good posture)
+        shoulder_diff = np.abs(left_shoulder[:, 1] - right_shoulder[:, 1])
+        shoulder_stability = np.maximum(0, 1 - shoulder_diff * 10)
+        
+        # Head position relative to shoulders
+        shoulder_center_x = (left_shoulder[:, 0] + right_shoulder[:, 0]) / 2
+        head_alignment = np.maximum(0, 1 - np.abs(poses[:, NOSE, 0] - shoulder_center_x) * 5)
+        
+        # Overall stability
+        return np.clip((shoulder_stability + head_alignment) / 2, 0, 1)
     
-    def _calculate_body_metrics(self, pose_data, gesture_count, stability_scores, duration):
+    def _calculate_body_metrics(self, frame_count, movement, gesture_count, stability, duration):
         """Calculate overall body language metrics"""
         
-        if not pose_data:
+        if not frame_count:
             return {
                 'overall_score': 0,
                 'posture_stability': 0,
@@ -215,12 +183,10 @@ class BodyLanguageAnalyzer:
             }
         
         # Average posture stability
-        avg_stability = np.mean(stability_scores) if stability_scores else 0
-        posture_stability = round(avg_stability * 10, 1)
+        posture_stability = round(float(np.mean(stability)) * 10, 1)
         
-        # Movement analysis
-        total_movement = sum(self._calculate_movement(pose, []) for pose in pose_data)
-        avg_movement = total_movement / len(pose_data) if pose_data else 0
+        # Movement analysis: average displacement between consecutive poses
+        avg_movement = float(np.mean(movement[1:])) if frame_count > 1 else 0
         
         # Optimal movement range (not too static, not too fidgety)
         optimal_movement = 0.1  # Adjust based on testing
@@ -256,27 +222,13 @@ class BodyLanguageAnalyzer:
             'gesture_score': gesture_score
         }
     
-    def _create_movement_timeline(self, pose_data):
+    def _create_movement_timeline(self, timestamps, movement, gestures):
         """Create timeline of movement intensity"""
-        timeline = []
-        
-        for i, pose in enumerate(pose_data):
-            # Calculate time stamp (assuming 5 fps processing)
-            timestamp = i * 0.2  # 5 frames per second
-            
-            # Calculate movement intensity
-            if i > 0:
-                movement = self._calculate_movement(pose, [pose_data[i-1]])
-            else:
-                movement = 0
-            
-            timeline.append({
-                'time': timestamp,
-                'movement_intensity': movement,
-                'gesture_active': self._detect_gesture(pose)
-            })
-        
-        return timeline
+        # Container timestamp of the frame each pose was detected in
+        return [
+            {'time': float(t), 'movement_intensity': float(m), 'gesture_active': bool(g)}
+            for t, m, g in zip(timestamps, movement, gestures)
+        ]
     
     def _generate_body_feedback(self, metrics):
         """Generate actionable feedback for body language"""
@@ -315,3 +267,84 @@ class BodyLanguageAnalyzer:
             feedback.append("Buen uso de gestos para complementar tu mensaje.")
         
         return feedback
+
+
+def empty_poses(frames=0):
+    """Pose tensor of ``frames`` frames x 33 landmarks x (x, y, z, visibility)"""
+    return np.zeros((frames, POSE_LANDMARKS, POSE_VALUES), dtype=np.float32)
+
+
+class BodyLanguageConsumer:
+    def __init__(self, analyzer):
+        """Collect pose landmarks for one analysis from a shared FrameSource"""
+        self.analyzer = analyzer
+        
+        self.sample_rate = analyzer.sample_rate
+        self.inference_size = analyzer.inference_size
+        
+        # Still frames reuse the landmarks of the last inference
+        self.scheduler = create_motion_scheduler()
+        self.last_landmarks = None
+        
+        # Landmarks of the frames with a detected person, preallocated in start()
+        self.poses = empty_poses(64)
+        self.timestamps = np.zeros(64)
+        self.count = 0
+        self.duration = 0
+        self.start_time = None
+    
+    def start(self, info):
+        """Receive the video properties before the first frame"""
+        self.duration = info['duration']
+        
+        # One row per sampled frame, with some slack for inaccurate container durations
+        frames = int(info['duration'] * self.sample_rate * 1.1) + 16
+        self.poses = empty_poses(frames)
+        self.timestamps = np.zeros(frames)
+    
+    def process(self, frame, timestamp):
+        """Analyze a single sampled frame"""
+        if self.scheduler is None or self.scheduler.should_infer(frame, timestamp):
+            self.last_landmarks = self.analyzer._process_frame(frame)
+        landmarks = self.last_landmarks
+        
+        if self.start_time is None:
+            self.start_time = timestamp
+        
+        if landmarks is not None:
+            if self.count == len(self.poses):
+                self._grow()
+            self.poses[self.count] = landmarks
+            self.timestamps[self.count] = timestamp
+            self.count += 1
+    
+    def latest_pose(self, timestamp, max_age):
+        """Landmarks of the last pose found at most ``max_age`` seconds before ``timestamp``, or None"""
+        if self.count and timestamp - self.timestamps[self.count - 1] <= max_age:
+            return self.poses[self.count - 1]
+        return None
+    
+    def _grow(self):
+        """Double the preallocated capacity"""
+        self.poses = np.concatenate([self.poses, empty_poses(len(self.poses))])
+        self.timestamps = np.concatenate([self.timestamps, np.zeros(len(self.timestamps))])
+    
+    def state(self):
+        """Collected data, picklable so segments analyzed in other processes can be merged"""
+        return {
+            'start_time': self.start_time or 0,
+            'poses': self.poses[:self.count].copy(),
+            'timestamps': self.timestamps[:self.count].copy(),
+            'duration': self.duration
+        }
+    
+    def finish(self):
+        """Calculate the final results once all frames were processed"""
+        try:
+            return self.analyzer._build_results(self.state())
+        except Exception as e:
+            return self.fail(e)
+    
+    def fail(self, error):
+        """Return the error results for this analysis"""
+        return self.analyzer._error_results(error)
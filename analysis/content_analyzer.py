@@ -3,6 +3,7 @@ import json
 from collections import Counter
 import math
 from datetime import datetime
+from analysis.phrase_matcher import lexicon_matcher
 
 class ContentAnalyzer:
     def __init__(self):
@@ -14,20 +15,9 @@ class ContentAnalyzer:
             'coherence': 0.2
         }
         
-        # Common transition words in Spanish and English
-        self.transition_words = {
-            'es': [
-                'además', 'por otro lado', 'sin embargo', 'por lo tanto', 
-                'en consecuencia', 'finalmente', 'en primer lugar', 'segundo',
-                'también', 'asimismo', 'no obstante', 'por consiguiente',
-                'en resumen', 'para concluir', 'en definitiva'
-            ],
-            'en': [
-                'furthermore', 'however', 'therefore', 'consequently', 
-                'finally', 'first', 'second', 'also', 'moreover',
-                'nevertheless', 'thus', 'in conclusion', 'to summarize'
-            ]
-        }
+        # Phrase lists live in config/lexicons.py and are matched with compiled patterns
+        # (see analysis.phrase_matcher); lexicons without a language filter use both
+        self.mixed_languages = ('es', 'en')
         
         # Key presentation elements
         self.presentation_elements = {
@@ -79,7 +69,7 @@ class ContentAnalyzer:
                 'detailed_metrics': {
                     'vocabulary_diversity': self._calculate_vocabulary_diversity(words),
                     'technical_terms': self._count_technical_terms(words),
-                    'engagement_elements': self._count_engagement_elements(text),
+                    'engagement_elements': self._count_engagement_elements(text, language),
                     'time_estimation': self._estimate_presentation_time(words)
                 }
             }
@@ -122,34 +112,28 @@ class ContentAnalyzer:
         structure_score = 0
         elements_found = {}
         
-        text_lower = text.lower()
-        
         # Check for introduction
-        intro_keywords = ['buenos días', 'buenas tardes', 'hola', 'mi nombre es', 
-                         'me llamo', 'soy', 'presentar', 'hablar sobre']
-        intro_found = any(keyword in text_lower[:200] for keyword in intro_keywords)
+        intro_matches = lexicon_matcher('introduction', language).find(text)
+        intro_found = any(start < 200 for _, start, _ in intro_matches)
         elements_found['introduction'] = intro_found
         if intro_found:
             structure_score += 2
         
         # Check for objectives
-        obj_keywords = ['objetivo', 'meta', 'propósito', 'vamos a ver', 'explicaré']
-        obj_found = any(keyword in text_lower for keyword in obj_keywords)
+        obj_found = lexicon_matcher('objectives', language).contains(text)
         elements_found['objectives'] = obj_found
         if obj_found:
             structure_score += 2
         
         # Check for conclusion
-        concl_keywords = ['en conclusión', 'para terminar', 'finalmente', 'resumiendo',
-                         'para concluir', 'en resumen']
-        concl_found = any(keyword in text_lower[-300:] for keyword in concl_keywords)
+        concl_matches = lexicon_matcher('conclusion', language).find(text)
+        concl_found = any(start >= len(text) - 300 for _, start, _ in concl_matches)
         elements_found['conclusion'] = concl_found
         if concl_found:
             structure_score += 2
         
-        # Check for transitions
-        transition_count = sum(1 for word in self.transition_words.get(language, []) 
-                              if word in text_lower)
+        # Check for transitions (distinct connectors used)
+        transition_count = len(lexicon_matcher('transitions', language).count(text))
         elements_found['transitions'] = transition_count
         if transition_count >= 3:
             structure_score += 2
@@ -240,9 +224,8 @@ class ContentAnalyzer:
             return {'score': 5, 'connection_strength': 0}
         
         # Check for logical connectors
-        connectors = self.transition_words.get(language, [])
-        connected_sentences = sum(1 for sentence in sentences 
-                                if any(conn in sentence.lower() for conn in connectors))
+        connectors = lexicon_matcher('transitions', language)
+        connected_sentences = sum(1 for sentence in sentences if connectors.contains(sentence))
         
         connection_ratio = connected_sentences / len(sentences)
         coherence_score += connection_ratio * 4
@@ -261,9 +244,7 @@ class ContentAnalyzer:
             coherence_score += 1
         
         # Check for proper sequencing words
-        sequence_words = ['primero', 'segundo', 'tercero', 'luego', 'después', 
-                         'finalmente', 'first', 'second', 'then', 'finally']
-        sequence_count = sum(1 for word in sequence_words if word in text.lower())
+        sequence_count = len(lexicon_matcher('sequence', self.mixed_languages).count(text))
         
         if sequence_count >= 2:
             coherence_score += 3
@@ -279,7 +260,6 @@ class ContentAnalyzer:
         """Analyze presentation flow and engagement"""
         
         flow_score = 0
-        text_lower = text.lower()
         
         # Check for questions (engagement)
         question_count = text.count('?')
@@ -289,30 +269,22 @@ class ContentAnalyzer:
             flow_score += 1
         
         # Check for examples
-        example_indicators = ['por ejemplo', 'como', 'tal como', 'for example', 'such as']
-        example_count = sum(1 for indicator in example_indicators 
-                           if indicator in text_lower)
+        example_count = len(lexicon_matcher('examples', self.mixed_languages).count(text))
         if example_count >= 2:
             flow_score += 2
         
         # Check for emphasis words
-        emphasis_words = ['importante', 'clave', 'fundamental', 'esencial', 
-                         'crucial', 'important', 'key', 'essential']
-        emphasis_count = sum(1 for word in emphasis_words if word in text_lower)
+        emphasis_count = len(lexicon_matcher('emphasis', self.mixed_languages).count(text))
         if emphasis_count >= 2:
             flow_score += 2
         
         # Check for audience engagement
-        engagement_phrases = ['ustedes', 'you', 'pregunta', 'question', 'opinión', 'opinion']
-        engagement_count = sum(1 for phrase in engagement_phrases 
-                              if phrase in text_lower)
+        engagement_count = len(lexicon_matcher('engagement', self.mixed_languages).count(text))
         if engagement_count >= 1:
             flow_score += 2
         
         # Check for clear sections
-        section_indicators = ['parte', 'sección', 'punto', 'tema', 'part', 'section', 'point']
-        section_count = sum(1 for indicator in section_indicators 
-                           if indicator in text_lower)
+        section_count = len(lexicon_matcher('sections', self.mixed_languages).count(text))
         if section_count >= 2:
             flow_score += 2
         
@@ -357,7 +329,7 @@ class ContentAnalyzer:
         long_words = [word for word in words if len(word) > 7]
         return len(set(long_words))
     
-    def _count_engagement_elements(self, text):
+    def _count_engagement_elements(self, text, language='es'):
         """Count elements that increase audience engagement"""
         engagement_count = 0
         
@@ -365,14 +337,10 @@ class ContentAnalyzer:
         engagement_count += text.count('?')
         
         # Direct address
-        direct_address = ['ustedes', 'vosotros', 'tú', 'usted']
-        engagement_count += sum(1 for addr in direct_address 
-                               if addr in text.lower())
+        engagement_count += len(lexicon_matcher('direct_address', language).count(text))
         
         # Call to action verbs
-        action_verbs = ['piensen', 'imaginen', 'consideren', 'recuerden']
-        engagement_count += sum(1 for verb in action_verbs 
-                               if verb in text.lower())
+        engagement_count += len(lexicon_matcher('action_verbs', language).count(text))
         
         return engagement_count
     
@@ -1,12 +1,55 @@
-import cv2
 import numpy as np
 import mediapipe as mp
-from collections import deque
-import math
+from analysis.body_language_analyzer import NOSE, LEFT_EAR, RIGHT_EAR, LEFT_SHOULDER, RIGHT_SHOULDER
+from utils.frame_source import downscale_frame, run_frame_analyzers
+from utils.motion_scheduler import adaptive_cache_key, create_motion_scheduler
+from config import settings
+
+# Face mesh landmark indices for key features
+LEFT_EYE = [33, 160, 158, 133, 153, 144]
+RIGHT_EYE = [362, 385, 387, 263, 373, 380]
+MOUTH = [61, 84, 17, 314, 405, 320, 307, 375]
+LEFT_EYEBROW, RIGHT_EYEBROW = 70, 300
+NOSE_TIP = 1
+MOUTH_LEFT, MOUTH_RIGHT, MOUTH_CENTER = 61, 291, 13
+
+# Only these landmarks are kept per frame, in this order
+FEATURE_LANDMARKS = LEFT_EYE + RIGHT_EYE + MOUTH + [
+    LEFT_EYEBROW, RIGHT_EYEBROW, NOSE_TIP, MOUTH_LEFT, MOUTH_RIGHT, MOUTH_CENTER
+]
+
+# Position of each feature in the gathered landmark array
+LEFT_EYE_POINTS = slice(0, 6)
+RIGHT_EYE_POINTS = slice(6, 12)
+MOUTH_POINTS = slice(12, 20)
+LEFT_EYEBROW_POINT, RIGHT_EYEBROW_POINT, NOSE_TIP_POINT = 20, 21, 22
+MOUTH_LEFT_POINT, MOUTH_RIGHT_POINT, MOUTH_CENTER_POINT = 23, 24, 25
+
+# Side of the face crop as a multiple of the head width (ear to ear) found by the pose model
+FACE_ROI_SCALE = 2.5
+
+# Poses older than this (seconds) are not trusted to locate the face
+FACE_ROI_MAX_POSE_AGE = 1.0
+
+# Emotions classified from the face geometry and their base confidence
+EMOTIONS = ["confident", "nervous", "surprised", "neutral"]
+EMOTION_CONFIDENCE = np.array([0.8, 0.3, 0.6, 0.5])
 
 class FacialAnalyzer:
-    def __init__(self):
+    # Bump when a change alters the results, so cached analyses are recomputed
+    VERSION = 7
+    
+    def __init__(self, sample_rate=None, inference_size=None):
         """Initialize MediaPipe face detection and analysis"""
+        # Frames analyzed per second of video, whatever the source frame rate
+        self.sample_rate = sample_rate or settings.FACIAL_ANALYSIS_FPS
+        
+        # Face mesh landmarks are normalized, so inference can run on a downscaled frame
+        self.inference_size = settings.FACE_INFERENCE_SIZE if inference_size is None else inference_size
+        
+        # Side (pixels) of the square face crop given to FaceMesh when a pose is available
+        self.roi_size = settings.FACE_ROI_SIZE if settings.FACE_ROI else 0
+        
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
             static_image_mode=False,
@@ -15,322 +58,309 @@ class FacialAnalyzer:
             min_detection_confidence=0.5,
             min_tracking_confidence=0.5
         )
-        
-        # Face landmark indices for key features
-        self.left_eye_indices = [33, 160, 158, 133, 153, 144]
-        self.right_eye_indices = [362, 385, 387, 263, 373, 380]
-        self.mouth_indices = [61, 84, 17, 314, 405, 320, 307, 375]
-        
+    
     def analyze(self, video_path):
         """Analyze facial expressions and eye contact from video"""
-        
+        return run_frame_analyzers(video_path, [self])[0]
+    
+    def cache_key(self):
+        """Version and settings that determine the results of this analyzer"""
+        return (
+            f"facial-v{self.VERSION}-fps{self.sample_rate}-size{self.inference_size}"
+            f"-roi{self.roi_size}-{adaptive_cache_key()}"
+        )
+    
+    def create_consumer(self):
+        """Create a frame consumer holding the state of one analysis"""
+        return FacialConsumer(self)
+    
+    def finish_segments(self, states):
+        """Merge the states of consecutive video segments into the final results"""
         try:
-            cap = cv2.VideoCapture(video_path)
-            
-            if not cap.isOpened():
-                raise Exception("No se pudo abrir el video")
-            
-            # Get video properties
-            fps = cap.get(cv2.CAP_PROP_FPS)
-            total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            duration = total_frames / fps if fps > 0 else 0
-            
-            # Analysis variables
-            eye_contact_scores = []
-            smile_detections = []
-            emotion_timeline = []
-            confidence_scores = []
-            blink_count = 0
-            
-            frame_count = 0
-            last_blink_state = False
-            
-            while True:
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Process every 3rd frame for efficiency
-                if frame_count % 3 == 0:
-                    results = self._process_frame(frame)
-                    
-                    if results:
-                        # Eye contact analysis
-                        eye_contact_score = self._analyze_eye_contact(results)
-                        eye_contact_scores.append(eye_contact_score)
-                        
-                        # Smile detection
-                        smile_score = self._detect_smile(results)
-                        smile_detections.append(smile_score)
-                        
-                        # Emotion and confidence analysis
-                        emotion_data = self._analyze_emotion(results, frame)
-                        emotion_timeline.append({
-                            'time': frame_count / fps if fps > 0 else 0,
-                            'confidence': emotion_data['confidence'],
-                            'emotion': emotion_data['emotion'],
-                            'smile_intensity': smile_score
-                        })
-                        
-                        confidence_scores.append(emotion_data['confidence'])
-                        
-                        # Blink detection
-                        blink_detected = self._detect_blink(results)
-                        if blink_detected and not last_blink_state:
-                            blink_count += 1
-                        last_blink_state = blink_detected
-                
-                frame_count += 1
-            
-            cap.release()
-            
-            # Calculate final metrics
-            analysis_results = self._calculate_facial_metrics(
-                eye_contact_scores, smile_detections, confidence_scores,
-                blink_count, duration
-            )
-            
-            # Generate feedback
-            feedback = self._generate_facial_feedback(analysis_results)
-            
-            return {
-                'score': analysis_results['overall_score'],
-                'eye_contact_score': analysis_results['eye_contact_score'],
-                'confidence_score': analysis_results['confidence_score'],
-                'smile_count': analysis_results['smile_count'],
-                'blink_rate': analysis_results['blink_rate'],
-                'emotion_timeline': emotion_timeline,
-                'feedback': feedback
-            }
-            
+            return self._build_results(self._merge_states(states))
         except Exception as e:
-            return {
-                'score': 0,
-                'eye_contact_score': 0,
-                'confidence_score': 0,
-                'smile_count': 0,
-                'blink_rate': 0,
-                'emotion_timeline': [],
-                'feedback': [f"Error en análisis facial: {str(e)}"]
+            return self._error_results(e)
+    
+    def _merge_states(self, states):
+        """Concatenate segment states in time order"""
+        # Blinks are detected on the merged frame sequence, so a blink spanning
+        # a segment boundary is counted once
+        states = sorted(states, key=lambda state: state['start_time'])
+        
+        return {
+            'start_time': states[0]['start_time'] if states else 0,
+            'points': np.concatenate([state['points'] for state in states]) if states else empty_face_points(),
+            'timestamps': np.concatenate([state['timestamps'] for state in states]) if states else np.zeros(0),
+            'inferred': np.concatenate([state['inferred'] for state in states]) if states else np.zeros(0, dtype=bool),
+            'duration': states[-1]['duration'] if states else 0
+        }
+    
+    def _build_results(self, state):
+        """Build the final facial results from the collected landmark arrays"""
+        # Face geometry is measured once, then every classifier reads the features
+        features = self._extract_features(state['points'])
+        
+        smile_detections = self._detect_smile(features)
+        emotions, confidence_scores = self._analyze_emotion(features)
+        
+        blink_count, blink_duration = self._count_blinks(
+            self._detect_blink(features), state['timestamps'], state['inferred']
+        )
+        
+        # Calculate final metrics
+        analysis_results = self._calculate_facial_metrics(
+            features['eye_contact'], smile_detections, confidence_scores, blink_count, blink_duration
+        )
+        
+        # Generate feedback
+        feedback = self._generate_facial_feedback(analysis_results)
+        
+        emotion_timeline = [
+            {
+                'time': float(t),
+                'confidence': float(confidence),
+                'emotion': EMOTIONS[emotion],
+                'smile_intensity': float(smile)
             }
+            for t, confidence, emotion, smile in zip(state['timestamps'], confidence_scores, emotions, smile_detections)
+        ]
+        
+        return {
+            'score': analysis_results['overall_score'],
+            'eye_contact_score': analysis_results['eye_contact_score'],
+            'confidence_score': analysis_results['confidence_score'],
+            'smile_count': analysis_results['smile_count'],
+            'blink_rate': analysis_results['blink_rate'],
+            'emotion_timeline': emotion_timeline,
+            'feedback': feedback
+        }
+    
+    def _error_results(self, error):
+        """Build the results returned when the analysis fails"""
+        return {
+            'score': 0,
+            'eye_contact_score': 0,
+            'confidence_score': 0,
+            'smile_count': 0,
+            'blink_rate': 0,
+            'emotion_timeline': [],
+            'feedback': [f"Error en análisis facial: {str(error)}"],
+            'error': str(error)
+        }
     
-    def _process_frame(self, frame):
-        """Process single frame for facial analysis"""
+    def _process_frame(self, rgb_frame, frame_size=None, roi=None, full_frame=None):
+        """Process single RGB frame for facial analysis
+        
+        With a ``roi`` (x, y, side in pixels of ``full_frame``, the FullFrame
+        of the same frame) FaceMesh runs on that square crop, scaled to
+        ``roi_size``; otherwise, or if no face is found in the crop, on the
+        whole frame scaled to ``inference_size``.
+        Returns the FEATURE_LANDMARKS as an array of (x, y, z) or None if no
+        face was found.
+        """
         
         try:
-            # Convert BGR to RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Process face mesh
-            results = self.face_mesh.process(rgb_frame)
+            points = None
             
-            if results.multi_face_landmarks:
-                # Get first face landmarks
-                face_landmarks = results.multi_face_landmarks[0]
-                
-                # Convert landmarks to pixel coordinates
-                h, w, _ = frame.shape
-                landmarks = []
-                for landmark in face_landmarks.landmark:
-                    x = int(landmark.x * w)
-                    y = int(landmark.y * h)
-                    landmarks.append([x, y, landmark.z])
+            if roi is not None:
+                x, y, side = roi
+                points = self._detect_landmarks(full_frame.crop(x, y, side, side, (self.roi_size, self.roi_size)))
                 
-                return {
-                    'landmarks': landmarks,
-                    'frame_shape': (h, w)
-                }
-            
-            return None
+                if points is not None:
+                    # Crop coordinates back to normalized coordinates of the whole frame
+                    frame_h, frame_w = full_frame.shape[:2]
+                    points[:, 0] = (x + points[:, 0] * side) / frame_w
+                    points[:, 1] = (y + points[:, 1] * side) / frame_h
+                    points[:, 2] *= side / frame_w
+            
+            if points is None:
+                points = self._detect_landmarks(downscale_frame(rgb_frame, self.inference_size))
+            
+            if points is None:
+                return None
+            
+            # Convert landmarks to pixel coordinates of the original video, so the
+            # pixel based thresholds do not depend on the inference resolution
+            h, w, _ = rgb_frame.shape
+            if frame_size and all(frame_size):
+                # Rotated phone videos report the unrotated stream size
+                if (frame_size[0] > frame_size[1]) == (w > h):
+                    w, h = frame_size
+                else:
+                    h, w = frame_size
+            
+            points[:, 0] *= w
+            points[:, 1] *= h
+            return points
             
         except Exception:
             return None
     
-    def _analyze_eye_contact(self, face_data):
-        """Analyze eye contact quality"""
+    def _detect_landmarks(self, rgb_image):
+        """Normalized FEATURE_LANDMARKS of the first face FaceMesh finds in the image, or None"""
+        results = self.face_mesh.process(rgb_image)
         
-        try:
-            landmarks = face_data['landmarks']
-            
-            # Get eye landmarks
-            left_eye_points = [landmarks[i] for i in self.left_eye_indices]
-            right_eye_points = [landmarks[i] for i in self.right_eye_indices]
-            
-            # Calculate eye direction (simplified)
-            # This is a basic approximation - more sophisticated gaze estimation would be needed
-            
-            # Calculate eye center
-            left_eye_center = np.mean(left_eye_points, axis=0)
-            right_eye_center = np.mean(right_eye_points, axis=0)
-            
-            # Calculate eye aspect ratio (for openness)
-            left_ear = self._calculate_eye_aspect_ratio(left_eye_points)
-            right_ear = self._calculate_eye_aspect_ratio(right_eye_points)
-            
-            # Average eye openness
-            eye_openness = (left_ear + right_ear) / 2
-            
-            # Simple eye contact estimation based on eye openness and position
-            # In a real implementation, this would use more sophisticated gaze estimation
-            eye_contact_score = min(1.0, eye_openness * 3)  # Normalize to 0-1
-            
-            return eye_contact_score
-            
-        except Exception:
-            return 0.5
+        if not results.multi_face_landmarks:
+            return None
+        
+        face_landmarks = results.multi_face_landmarks[0].landmark
+        return np.array(
+            [(face_landmarks[i].x, face_landmarks[i].y, face_landmarks[i].z) for i in FEATURE_LANDMARKS],
+            dtype=np.float32
+        )
+    
+    def _face_roi(self, pose, frame_shape):
+        """Square face region (x, y, side in pixels) around the head of a pose, or None
+        
+        ``pose`` holds the normalized (x, y, z, visibility) pose landmarks.
+        No region is returned when the nose is not visible or the face
+        already fills most of the frame.
+        """
+        h, w = frame_shape[:2]
+        if pose[NOSE, 3] < 0.5:
+            return None
+        
+        scale = np.array([w, h])
+        if min(pose[LEFT_EAR, 3], pose[RIGHT_EAR, 3]) >= 0.5:
+            head_width = np.linalg.norm((pose[LEFT_EAR, :2] - pose[RIGHT_EAR, :2]) * scale)
+        else:
+            # Ears hidden (e.g. in profile): the head is about half as wide as the shoulders
+            head_width = np.linalg.norm((pose[LEFT_SHOULDER, :2] - pose[RIGHT_SHOULDER, :2]) * scale) / 2
+        
+        side = int(head_width * FACE_ROI_SCALE)
+        if side < 32 or side > 0.8 * min(h, w):
+            return None
+        
+        # Centered on the nose and moved inside the frame at the borders
+        center_x, center_y = pose[NOSE, :2] * scale
+        x = int(np.clip(center_x - side / 2, 0, w - side))
+        y = int(np.clip(center_y - side / 2, 0, h - side))
+        return x, y, side
+    
+    def _extract_features(self, points):
+        """Per-frame feature record shared by all the facial classifiers
+        
+        One array per feature, one row per frame: eye aspect ratio, mouth
+        aspect (width to height), mouth curve, eyebrow height and eye contact.
+        """
+        xy = points[:, :, :2]
+        y = points[:, :, 1]
+        
+        # Average eye openness
+        ear = (
+            self._calculate_eye_aspect_ratio(xy[:, LEFT_EYE_POINTS]) +
+            self._calculate_eye_aspect_ratio(xy[:, RIGHT_EYE_POINTS])
+        ) / 2.0
+        
+        # Mouth width to height, wider when smiling (0 when the height is degenerate)
+        mouth_points = xy[:, MOUTH_POINTS]
+        mouth_width = np.linalg.norm(mouth_points[:, 0] - mouth_points[:, 4], axis=1)
+        mouth_height = np.linalg.norm(mouth_points[:, 2] - mouth_points[:, 6], axis=1)
+        mouth_aspect = np.divide(mouth_width, mouth_height, out=np.zeros(len(mouth_height)), where=mouth_height > 0)
+        
+        # Mouth curve (positive = smile, negative = frown)
+        mouth_curve = (y[:, MOUTH_LEFT_POINT] + y[:, MOUTH_RIGHT_POINT]) / 2 - y[:, MOUTH_CENTER_POINT]
+        
+        # Eyebrow height relative to nose (higher = surprise/happiness, lower = anger/sadness)
+        eyebrow_height = (
+            y[:, NOSE_TIP_POINT] - y[:, LEFT_EYEBROW_POINT] + y[:, NOSE_TIP_POINT] - y[:, RIGHT_EYEBROW_POINT]
+        ) / 2
+        
+        return {
+            'ear': ear,
+            'mouth_aspect': mouth_aspect,
+            'mouth_curve': mouth_curve,
+            'eyebrow_height': eyebrow_height,
+            'eye_contact': self._analyze_eye_contact(ear)
+        }
+    
+    def _analyze_eye_contact(self, ear):
+        """Eye contact quality (0-1) of every frame"""
+        
+        # Simple eye contact estimation based on eye openness
+        # In a real implementation, this would use more sophisticated gaze estimation
+        return np.minimum(1.0, ear * 3)  # Normalize to 0-1
     
     def _calculate_eye_aspect_ratio(self, eye_points):
-        """Calculate eye aspect ratio for blink detection"""
+        """Eye aspect ratio of every frame, from its six eye landmarks"""
         
-        try:
-            # Vertical eye landmarks
-            A = math.sqrt((eye_points[1][0] - eye_points[5][0])**2 + 
-                         (eye_points[1][1] - eye_points[5][1])**2)
-            B = math.sqrt((eye_points[2][0] - eye_points[4][0])**2 + 
-                         (eye_points[2][1] - eye_points[4][1])**2)
-            
-            # Horizontal eye landmark
-            C = math.sqrt((eye_points[0][0] - eye_points[3][0])**2 + 
-                         (eye_points[0][1] - eye_points[3][1])**2)
-            
-            # Eye aspect ratio
-            ear = (A + B) / (2.0 * C)
-            return ear
-            
-        except Exception:
-            return 0.25
+        # Vertical eye landmarks
+        A = np.linalg.norm(eye_points[:, 1] - eye_points[:, 5], axis=1)
+        B = np.linalg.norm(eye_points[:, 2] - eye_points[:, 4], axis=1)
+        
+        # Horizontal eye landmark
+        C = np.linalg.norm(eye_points[:, 0] - eye_points[:, 3], axis=1)
+        
+        # Eye aspect ratio, 0.25 (open) for degenerate detections
+        return np.divide(A + B, 2.0 * C, out=np.full(len(C), 0.25), where=C > 0)
     
-    def _detect_smile(self, face_data):
-        """Detect smile intensity"""
+    def _detect_smile(self, features):
+        """Smile intensity (0-1) of every frame"""
+        mouth_aspect = features['mouth_aspect']
         
-        try:
-            landmarks = face_data['landmarks']
-            
-            # Get mouth landmarks
-            mouth_points = [landmarks[i] for i in self.mouth_indices]
-            
-            # Calculate mouth width
-            mouth_width = math.sqrt(
-                (mouth_points[0][0] - mouth_points[4][0])**2 + 
-                (mouth_points[0][1] - mouth_points[4][1])**2
-            )
-            
-            # Calculate mouth height
-            mouth_height = math.sqrt(
-                (mouth_points[2][0] - mouth_points[6][0])**2 + 
-                (mouth_points[2][1] - mouth_points[6][1])**2
-            )
-            
-            # Smile ratio (width to height)
-            if mouth_height > 0:
-                smile_ratio = mouth_width / mouth_height
-                # Normalize smile score (higher ratio indicates more smile)
-                smile_score = min(1.0, max(0.0, (smile_ratio - 2.5) / 2.0))
-            else:
-                smile_score = 0.0
-            
-            return smile_score
-            
-        except Exception:
-            return 0.0
+        # Normalize smile score (higher ratio indicates more smile)
+        return np.where(mouth_aspect > 0, np.clip((mouth_aspect - 2.5) / 2.0, 0.0, 1.0), 0.0)
     
-    def _analyze_emotion(self, face_data, frame):
-        """Analyze emotional state and confidence"""
+    def _analyze_emotion(self, features):
+        """Emotion (index into EMOTIONS) and confidence of every frame"""
+        # This is a simplified emotion analysis
+        # In a real implementation, you would use a trained emotion recognition model
+        mouth_curve = features['mouth_curve']
         
-        try:
-            # This is a simplified emotion analysis
-            # In a real implementation, you would use a trained emotion recognition model
-            
-            landmarks = face_data['landmarks']
-            
-            # Calculate facial features for emotion estimation
-            
-            # Eyebrow position (higher = surprise/happiness, lower = anger/sadness)
-            eyebrow_left = landmarks[70]  # Left eyebrow
-            eyebrow_right = landmarks[300]  # Right eyebrow
-            nose_tip = landmarks[1]  # Nose tip
-            
-            # Eyebrow height relative to nose
-            eyebrow_height = (nose_tip[1] - eyebrow_left[1] + nose_tip[1] - eyebrow_right[1]) / 2
-            
-            # Mouth corners
-            mouth_left = landmarks[61]
-            mouth_right = landmarks[291]
-            mouth_center = landmarks[13]
-            
-            # Mouth curve (positive = smile, negative = frown)
-            mouth_curve = (mouth_left[1] + mouth_right[1]) / 2 - mouth_center[1]
-            
-            # Simple emotion classification
-            if mouth_curve > 5:  # Smiling
-                emotion = "confident"
-                confidence = 0.8
-            elif mouth_curve < -3:  # Frowning
-                emotion = "nervous"
-                confidence = 0.3
-            elif eyebrow_height > 50:  # Raised eyebrows
-                emotion = "surprised"
-                confidence = 0.6
-            else:
-                emotion = "neutral"
-                confidence = 0.5
-            
-            # Add some variation based on eye contact
-            eye_contact_score = self._analyze_eye_contact(face_data)
-            confidence = (confidence + eye_contact_score) / 2
-            
-            return {
-                'emotion': emotion,
-                'confidence': confidence
-            }
-            
-        except Exception:
-            return {
-                'emotion': "neutral",
-                'confidence': 0.5
-            }
+        # Simple emotion classification: smiling, frowning, raised eyebrows, neutral
+        emotions = np.select(
+            [mouth_curve > 5, mouth_curve < -3, features['eyebrow_height'] > 50],
+            [0, 1, 2],
+            default=3
+        )
+        
+        # Add some variation based on eye contact
+        confidence = (EMOTION_CONFIDENCE[emotions] + features['eye_contact']) / 2
+        
+        return emotions, confidence
     
-    def _detect_blink(self, face_data):
-        """Detect if person is blinking"""
+    def _detect_blink(self, features):
+        """Whether the eyes are closed in every frame"""
         
-        try:
-            landmarks = face_data['landmarks']
-            
-            # Get eye landmarks
-            left_eye_points = [landmarks[i] for i in self.left_eye_indices]
-            right_eye_points = [landmarks[i] for i in self.right_eye_indices]
-            
-            # Calculate eye aspect ratios
-            left_ear = self._calculate_eye_aspect_ratio(left_eye_points)
-            right_ear = self._calculate_eye_aspect_ratio(right_eye_points)
-            
-            # Average EAR
-            ear = (left_ear + right_ear) / 2.0
-            
-            # Blink threshold (adjust based on testing)
-            blink_threshold = 0.2
-            
-            return ear < blink_threshold
-            
-        except Exception:
-            return False
+        # Blink threshold (adjust based on testing)
+        blink_threshold = 0.2
+        
+        return features['ear'] < blink_threshold
+    
+    def _count_blinks(self, closed, timestamps, inferred):
+        """Number of blinks and seconds of video in which they were looked for
+        
+        Reused landmarks cannot show a blink, so a blink is the eyes closing
+        between two consecutive sampled frames that were both inferred, and
+        only the time between such frames counts towards the blink rate.
+        """
+        intervals = np.diff(timestamps)
+        if not len(intervals):
+            return 0, 0.0
+        
+        # Frames further apart than one sampling step had frames without a face between them
+        step = max(1.0 / self.sample_rate, float(intervals.min()))
+        observed = inferred[1:] & inferred[:-1] & (intervals <= step * 1.5)
+        
+        blinks = np.count_nonzero(observed & closed[1:] & ~closed[:-1])
+        return int(blinks), float(intervals[observed].sum())
     
     def _calculate_facial_metrics(self, eye_contact_scores, smile_detections, 
                                 confidence_scores, blink_count, duration):
         """Calculate overall facial analysis metrics"""
         
         # Eye contact score
-        avg_eye_contact = np.mean(eye_contact_scores) if eye_contact_scores else 0
+        avg_eye_contact = float(np.mean(eye_contact_scores)) if len(eye_contact_scores) else 0
         eye_contact_score = round(avg_eye_contact * 10, 1)
         
         # Confidence score
-        avg_confidence = np.mean(confidence_scores) if confidence_scores else 0
+        avg_confidence = float(np.mean(confidence_scores)) if len(confidence_scores) else 0
         confidence_score = round(avg_confidence * 10, 1)
         
         # Smile analysis
         smile_threshold = 0.3
-        smile_count = sum(1 for score in smile_detections if score > smile_threshold)
-        smile_percentage = smile_count / len(smile_detections) if smile_detections else 0
+        smile_count = int(np.count_nonzero(smile_detections > smile_threshold))
+        smile_percentage = smile_count / len(smile_detections) if len(smile_detections) else 0
         
         # Blink rate (normal is 15-20 per minute)
         blink_rate = (blink_count / max(1, duration)) * 60 if duration > 0 else 0
@@ -406,3 +436,117 @@ class FacialAnalyzer:
             feedback.append("Parpadea más naturalmente para evitar verse muy tenso.")
         
         return feedback
+
+
+def empty_face_points(frames=0):
+    """Landmark array of ``frames`` frames x FEATURE_LANDMARKS x (x, y, z)"""
+    return np.zeros((frames, len(FEATURE_LANDMARKS), 3), dtype=np.float32)
+
+
+class FacialConsumer:
+    def __init__(self, analyzer):
+        """Collect facial landmarks for one analysis from a shared FrameSource"""
+        self.analyzer = analyzer
+        
+        self.sample_rate = analyzer.sample_rate
+        self.inference_size = analyzer.inference_size
+        self.frame_size = None
+        
+        # Still frames reuse the landmarks of the last inference; an inference is
+        # always followed by another one, so blinks can be seen, see _count_blinks()
+        self.scheduler = create_motion_scheduler()
+        self.last_points = None
+        self.inferred_run = 0
+        
+        # Body consumer whose poses locate the face, see connect()
+        self.pose_consumer = None
+        self.crops_full_frame = False
+        
+        # Landmarks of the frames with a detected face, preallocated in start(),
+        # and whether each row comes from its own inference
+        self.points = empty_face_points(64)
+        self.timestamps = np.zeros(64)
+        self.inferred = np.zeros(64, dtype=bool)
+        self.count = 0
+        self.duration = 0
+        self.start_time = None
+    
+    def start(self, info):
+        """Receive the video properties before the first frame"""
+        self.duration = info['duration']
+        self.frame_size = (info['width'], info['height'])
+        
+        # One row per sampled frame, with some slack for inaccurate container durations
+        frames = int(info['duration'] * self.sample_rate * 1.1) + 16
+        self.points = empty_face_points(frames)
+        self.timestamps = np.zeros(frames)
+        self.inferred = np.zeros(frames, dtype=bool)
+    
+    def connect(self, consumers):
+        """Crop the face around the poses of a body consumer that processes each frame first"""
+        if not self.analyzer.roi_size:
+            return
+        
+        for consumer in consumers:
+            if hasattr(consumer, 'latest_pose'):
+                self.pose_consumer = consumer
+                
+                # Crops are cut from the full resolution frame, next to the
+                # frame scaled to the inference size
+                self.crops_full_frame = True
+                return
+    
+    def process(self, frame, timestamp, full_frame=None):
+        """Analyze a single sampled frame"""
+        inferred = (
+            self.scheduler is None
+            or self.scheduler.should_infer(frame, timestamp)
+            or self.inferred_run == 1
+        )
+        self.inferred_run = self.inferred_run + 1 if inferred else 0
+        if inferred:
+            roi = None
+            if self.pose_consumer is not None and full_frame is not None:
+                pose = self.pose_consumer.latest_pose(timestamp, FACE_ROI_MAX_POSE_AGE)
+                if pose is not None:
+                    roi = self.analyzer._face_roi(pose, full_frame.shape)
+            self.last_points = self.analyzer._process_frame(frame, self.frame_size, roi, full_frame)
+        points = self.last_points
+        
+        if self.start_time is None:
+            self.start_time = timestamp
+        
+        if points is not None:
+            if self.count == len(self.points):
+                self._grow()
+            self.points[self.count] = points
+            self.timestamps[self.count] = timestamp
+            self.inferred[self.count] = inferred
+            self.count += 1
+    
+    def _grow(self):
+        """Double the preallocated capacity"""
+        self.points = np.concatenate([self.points, empty_face_points(len(self.points))])
+        self.timestamps = np.concatenate([self.timestamps, np.zeros(len(self.timestamps))])
+        self.inferred = np.concatenate([self.inferred, np.zeros(len(self.inferred), dtype=bool)])
+    
+    def state(self):
+        """Collected data, picklable so segments analyzed in other processes can be merged"""
+        return {
+            'start_time': self.start_time or 0,
+            'points': self.points[:self.count].copy(),
+            'timestamps': self.timestamps[:self.count].copy(),
+            'inferred': self.inferred[:self.count].copy(),
+            'duration': self.duration
+        }
+    
+    def finish(self):
+        """Calculate the final results once all frames were processed"""
+        try:
+            return self.analyzer._build_results(self.state())
+        except Exception as e:
+            return self.fail(e)
+    
+    def fail(self, error):
+        """Return the error results for this analysis"""
+        return self.analyzer._error_results(error)
@@ -0,0 +1,116 @@
+import gc
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from config import settings
+
+try:
+    import resource
+except ImportError:
+    # Unix only, on Windows the memory report is skipped
+    resource = None
+
+
+def current_rss_mb():
+    """Resident memory of this process in MB, or None where it cannot be measured"""
+    if resource is None:
+        return None
+
+    try:
+        # Linux: second field of statm is the resident size in pages
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Elsewhere fall back to the peak resident size (bytes on macOS, KB on Linux)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class ModelRegistry:
+    def __init__(self, loader, ttl=None):
+        """Load models on first use and share them within the process
+
+        Models not used for ``ttl`` seconds are released; 0 keeps them loaded.
+        """
+        self.loader = loader
+        self.ttl = settings.WHISPER_MODEL_TTL if ttl is None else ttl
+        self.load_stats = {}
+
+        self._models = {}
+        self._last_used = {}
+        self._in_use = {}
+        self._lock = threading.Lock()
+        self._sweeper = None
+
+    @contextmanager
+    def use(self, name):
+        """Borrow a model, loading it if needed; it is never evicted while borrowed"""
+        with self._lock:
+            if name not in self._models:
+                self._models[name] = self._load(name)
+            self._in_use[name] = self._in_use.get(name, 0) + 1
+            self._start_sweeper()
+
+        try:
+            yield self._models[name]
+        finally:
+            with self._lock:
+                self._in_use[name] -= 1
+                self._last_used[name] = time.monotonic()
+
+    def _load(self, name):
+        """Load a model, recording how long it took and the memory it added"""
+        rss_before = current_rss_mb()
+        start = time.perf_counter()
+
+        model = self.loader(name)
+
+        stats = {'load_seconds': round(time.perf_counter() - start, 2)}
+        rss_after = current_rss_mb()
+        if rss_after is None:
+            print(f"Model '{name}' loaded in {stats['load_seconds']}s")
+        else:
+            stats['rss_mb'] = round(rss_after)
+            stats['rss_delta_mb'] = round(rss_after - rss_before)
+            print(f"Model '{name}' loaded in {stats['load_seconds']}s "
+                  f"(RSS {stats['rss_mb']} MB, +{stats['rss_delta_mb']} MB)")
+        self.load_stats[name] = stats
+        return model
+
+    def evict_idle(self):
+        """Release the models that have not been used within the TTL"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [
+                name for name in self._models
+                if not self._in_use.get(name) and now - self._last_used.get(name, now) >= self.ttl
+            ]
+            for name in idle:
+                del self._models[name]
+                self._last_used.pop(name, None)
+
+        if idle:
+            gc.collect()
+            rss = current_rss_mb()
+            print(f"Released idle models: {', '.join(idle)}" + (f" (RSS {round(rss)} MB)" if rss is not None else ""))
+
+    def _start_sweeper(self):
+        """Start the background thread that evicts idle models"""
+        if self.ttl <= 0 or self._sweeper is not None:
+            return
+
+        def sweep():
+            while True:
+                time.sleep(max(1, self.ttl / 4))
+                self.evict_idle()
+
+        self._sweeper = threading.Thread(target=sweep, name='model-registry-sweeper', daemon=True)
+        self._sweeper.start()
+
+
+def whisper_model_name(mode='simple'):
+    """Whisper model size configured for an analysis mode"""
+    return settings.WHISPER_MODEL_ADVANCED if mode == 'advanced' else settings.WHISPER_MODEL_SIMPLE
@@ -0,0 +1,44 @@
+import re
+from collections import Counter
+from functools import lru_cache
+
+from config.lexicons import get_lexicon
+
+
+class PhraseMatcher:
+    def __init__(self, phrases):
+        """Compile words and multi-word phrases into a single case-insensitive pattern
+
+        Phrases match whole words only, any run of whitespace matches the
+        spaces inside a phrase and longer phrases win over their prefixes.
+        """
+        self.phrases = sorted({' '.join(phrase.lower().split()) for phrase in phrases}, key=len, reverse=True)
+
+        alternatives = '|'.join(r'\s+'.join(map(re.escape, phrase.split())) for phrase in self.phrases)
+        self.pattern = re.compile(rf'(?<!\w)(?:{alternatives})(?!\w)', re.IGNORECASE) if self.phrases else None
+
+    def find(self, text):
+        """Every match as (phrase, start, end) character offsets, in order"""
+        if self.pattern is None:
+            return []
+        return [(' '.join(m.group().lower().split()), m.start(), m.end()) for m in self.pattern.finditer(text)]
+
+    def count(self, text):
+        """Occurrences of every phrase found in the text"""
+        return Counter(phrase for phrase, _, _ in self.find(text))
+
+    def contains(self, text):
+        """Whether any phrase occurs in the text"""
+        return self.pattern is not None and self.pattern.search(text) is not None
+
+
+@lru_cache(maxsize=None)
+def lexicon_matcher(name, languages='es'):
+    """Matcher for a lexicon, compiled once per process; ``languages`` may be a tuple to merge several"""
+    if isinstance(languages, str):
+        languages = (languages,)
+
+    phrases = []
+    for language in languages:
+        phrases.extend(get_lexicon(name, language))
+    return PhraseMatcher(phrases)
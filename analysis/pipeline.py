@@ -0,0 +1,493 @@
+import math
+import multiprocessing
+import os
+import queue
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from config import settings
+
+# Analyzers created lazily inside each worker process and reused across jobs
+_worker_analyzers = {}
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside the branch workers once the run they belong to is cancelled"""
+
+
+def _get_analyzer(name):
+    """Return the analyzer instance of this worker process, creating it on first use"""
+    if name not in _worker_analyzers:
+        if name == 'voice':
+            from analysis.voice_analyzer import VoiceAnalyzer
+            _worker_analyzers[name] = VoiceAnalyzer()
+        elif name == 'body':
+            from analysis.body_language_analyzer import BodyLanguageAnalyzer
+            _worker_analyzers[name] = BodyLanguageAnalyzer()
+        elif name == 'facial':
+            from analysis.facial_analyzer import FacialAnalyzer
+            _worker_analyzers[name] = FacialAnalyzer()
+
+    return _worker_analyzers[name]
+
+
+def analyzer_cache_keys(mode, names=('voice', 'body', 'facial')):
+    """Cache keys of the analyzers of this process; ``mode`` selects the Whisper model"""
+    return {
+        name: _get_analyzer(name).cache_key(mode) if name == 'voice' else _get_analyzer(name).cache_key()
+        for name in names
+    }
+
+
+def _branch_progress(progress_queue, branch, part, cancel_event):
+    """Progress callback of a branch worker, stopping the branch once the run is cancelled"""
+    def report(fraction, partial=None):
+        if cancel_event.is_set():
+            raise AnalysisCancelled("Análisis cancelado")
+        progress_queue.put((branch, part, fraction, partial))
+    return report
+
+
+def voice_partial_summary(update, max_chars=400):
+    """Compact view of a partial voice result for the progress display"""
+    text = update['transcription']
+    if len(text) > max_chars:
+        # Keep the end of the transcription, starting at a whole word
+        text = '…' + text[-max_chars:].split(' ', 1)[-1]
+
+    return {
+        'transcription': text,
+        'word_count': update['word_count'],
+        'filler_count': update['filler_count'],
+        'speaking_rate': update['speaking_rate']
+    }
+
+
+def _run_voice_branch(video_path, progress_queue, mode, cancel_event):
+    """Audio branch: Whisper transcription and prosody analysis"""
+    analyzer = _get_analyzer('voice')
+    report = _branch_progress(progress_queue, 'voice', 0, cancel_event)
+    return analyzer.analyze(
+        video_path,
+        progress_callback=report,
+        mode=mode,
+        partial_callback=lambda update: report(update['progress'], voice_partial_summary(update)),
+        cancel_event=cancel_event
+    )
+
+
+def _run_vision_branch(video_path, progress_queue, cancel_event):
+    """Vision branch: body language and facial analysis over one decode pass"""
+    from utils.frame_source import run_frame_analyzers
+
+    return run_frame_analyzers(
+        video_path,
+        [_get_analyzer('body'), _get_analyzer('facial')],
+        progress_callback=_branch_progress(progress_queue, 'vision', 0, cancel_event)
+    )
+
+
+def _run_vision_segment(video_path, start_time, end_time, part, progress_queue, cancel_event):
+    """Vision branch restricted to one time segment, returning mergeable states"""
+    from utils.frame_source import connect_consumers, open_frame_source
+
+    # Each worker process has its own MediaPipe graphs
+    body_consumer = _get_analyzer('body').create_consumer()
+    facial_consumer = _get_analyzer('facial').create_consumer()
+    connect_consumers([body_consumer, facial_consumer])
+
+    try:
+        source = open_frame_source(video_path, start_time, end_time)
+        source.register(body_consumer)
+        source.register(facial_consumer)
+        source.run(progress_callback=_branch_progress(progress_queue, 'vision', part, cancel_event))
+    except AnalysisCancelled:
+        raise
+    except Exception as e:
+        return {'error': str(e)}
+
+    return {'body': body_consumer.state(), 'facial': facial_consumer.state()}
+
+
+def _finish_vision_segments(segment_results):
+    """Merge the segment states into the final body and facial results"""
+    body_analyzer = _get_analyzer('body')
+    facial_analyzer = _get_analyzer('facial')
+
+    errors = [result['error'] for result in segment_results if 'error' in result]
+    if errors:
+        return (
+            body_analyzer.create_consumer().fail(errors[0]),
+            facial_analyzer.create_consumer().fail(errors[0])
+        )
+
+    return (
+        body_analyzer.finish_segments([result['body'] for result in segment_results]),
+        facial_analyzer.finish_segments([result['facial'] for result in segment_results])
+    )
+
+
+def split_segments(duration, segment_seconds, max_segments):
+    """Split ``duration`` into at most ``max_segments`` equal time segments"""
+    if duration <= 0 or segment_seconds <= 0:
+        return [(0, None)]
+
+    count = max(1, min(max_segments, math.ceil(duration / segment_seconds)))
+    if count == 1:
+        return [(0, None)]
+
+    length = duration / count
+    # The last segment is open-ended, so frames past the metadata duration are kept
+    return [(i * length, (i + 1) * length if i < count - 1 else None) for i in range(count)]
+
+
+class ParallelPipeline:
+    def __init__(self, max_workers=None):
+        """Start the worker processes that run the analysis branches"""
+        self.max_workers = max(2, max_workers or settings.MAX_WORKERS)
+        self._start()
+
+    def _start(self):
+        """Start the executors and the manager sharing progress queues with them"""
+        # Spawn keeps MediaPipe and Whisper state out of the Streamlit process
+        context = multiprocessing.get_context('spawn')
+
+        # The voice branch always runs in the same process, so Whisper and the
+        # transcription workers it starts are loaded once per pipeline
+        self.voice_executor = ProcessPoolExecutor(max_workers=1, mp_context=context)
+        self.executor = ProcessPoolExecutor(max_workers=self.max_workers - 1, mp_context=context)
+        self.manager = context.Manager()
+
+    def run(self, video_path, progress_callback=None, duration=0, branches=('voice', 'vision'), mode='simple',
+            partial_callback=None):
+        """Run the voice and vision branches concurrently and merge their results
+
+        Long videos are split into time segments so the vision branch can use
+        every worker left over by the voice branch. Only the results of the
+        requested ``branches`` are returned; ``mode`` selects the Whisper model.
+        ``partial_callback(branch, partial)`` receives the partial voice results.
+        If a callback raises (e.g. the job was cancelled) the branches are stopped.
+        """
+        try:
+            return self._run(video_path, progress_callback, duration, branches, mode, partial_callback)
+        except BrokenProcessPool as e:
+            # A worker died (e.g. killed when out of memory) and the executor cannot
+            # take new work, so the next job starts with new worker processes
+            self.shutdown()
+            self._start()
+            raise Exception("Un proceso de análisis terminó inesperadamente, posiblemente por falta de memoria") from e
+
+    def cache_keys(self, mode):
+        """Cache keys of the analyzers held by the branch workers"""
+        for attempt in range(2):
+            try:
+                voice_keys = self.voice_executor.submit(analyzer_cache_keys, mode, ('voice',))
+                vision_keys = self.executor.submit(analyzer_cache_keys, mode, ('body', 'facial'))
+                return {**voice_keys.result(), **vision_keys.result()}
+            except BrokenProcessPool:
+                # A worker died while idle, e.g. killed to free memory
+                self.shutdown()
+                self._start()
+                if attempt:
+                    raise
+
+    def _run(self, video_path, progress_callback, duration, branches, mode, partial_callback):
+        """Run the requested branches on the current executor, see run()"""
+        progress_queue = self.manager.Queue()
+        cancel_event = self.manager.Event()
+        parts = {}
+
+        voice_future = None
+        if 'voice' in branches:
+            voice_future = self.voice_executor.submit(
+                _run_voice_branch, video_path, progress_queue, mode, cancel_event
+            )
+            parts['voice'] = [0.0]
+
+        vision_futures = []
+        if 'vision' in branches:
+            segments = split_segments(duration, settings.VIDEO_SEGMENT_SECONDS, self.max_workers - 1)
+            if len(segments) == 1:
+                vision_futures = [self.executor.submit(_run_vision_branch, video_path, progress_queue, cancel_event)]
+            else:
+                vision_futures = [
+                    self.executor.submit(
+                        _run_vision_segment, video_path, start, end, part, progress_queue, cancel_event
+                    )
+                    for part, (start, end) in enumerate(segments)
+                ]
+            parts['vision'] = [0.0] * len(vision_futures)
+
+        # Progress of every part of each branch, averaged per branch for the caller
+        pending = set(vision_futures)
+        if voice_future:
+            pending.add(voice_future)
+
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.25)
+                self._drain_progress(progress_queue, parts, progress_callback, partial_callback)
+
+                for future in done:
+                    if future is voice_future:
+                        parts['voice'][0] = 1.0
+                    else:
+                        parts['vision'][vision_futures.index(future)] = 1.0
+                    self._report(parts, progress_callback)
+        except BaseException:
+            # Branches still running stop at their next progress report
+            cancel_event.set()
+            for future in pending:
+                future.cancel()
+            raise
+
+        results = {}
+        if voice_future:
+            results['voice_analysis'] = voice_future.result()
+
+        if len(vision_futures) == 1:
+            results['body_analysis'], results['facial_analysis'] = vision_futures[0].result()
+        elif vision_futures:
+            results['body_analysis'], results['facial_analysis'] = self.executor.submit(
+                _finish_vision_segments, [future.result() for future in vision_futures]
+            ).result()
+
+        return results
+
+    def _drain_progress(self, progress_queue, parts, progress_callback, partial_callback=None):
+        """Collect the progress and partial results reported by the workers"""
+        updated = False
+        while True:
+            try:
+                branch, part, fraction, partial = progress_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            parts[branch][part] = fraction
+            updated = True
+            if partial is not None and partial_callback:
+                partial_callback(branch, partial)
+
+        if updated:
+            self._report(parts, progress_callback)
+
+    def _report(self, parts, progress_callback):
+        """Forward the progress of each branch to the caller"""
+        if progress_callback:
+            for branch, fractions in parts.items():
+                progress_callback(branch, sum(fractions) / len(fractions))
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        self.voice_executor.shutdown(wait=False, cancel_futures=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.manager.shutdown()
+
+
+class AnalysisRunner:
+    def __init__(self):
+        """Create the result cache and branch pipeline used by analysis jobs
+
+        With the parallel pipeline the voice, body and facial analyzers live
+        in the branch workers; otherwise they are created in this process on
+        first use.
+        """
+        from analysis.content_analyzer import ContentAnalyzer
+        from utils.analysis_cache import AnalysisCache
+        from utils.video_processor import VideoProcessor
+
+        self.video_processor = VideoProcessor()
+        self.content_analyzer = ContentAnalyzer()
+        self.analysis_cache = AnalysisCache(settings.ANALYSIS_CACHE_DIR, settings.MAX_CACHE_SIZE) if settings.ANALYSIS_CACHE else None
+        self.parallel_pipeline = ParallelPipeline() if settings.PARALLEL_PIPELINE else None
+
+    def run(self, job, progress_callback=None):
+        """Analyze the video of a job and return the complete analysis results"""
+        from utils.frame_source import run_frame_analyzers
+
+        video_path = job['video_path']
+        is_advanced = job.get('is_advanced', False)
+        script_content = job.get('script_content')
+        mode = 'advanced' if is_advanced else 'simple'
+        branch_progress = {}
+        partials = {}
+
+        def report(stage, percent):
+            if progress_callback:
+                progress = {'stage': stage, 'percent': percent, 'branches': dict(branch_progress)}
+                if partials:
+                    progress['partial'] = dict(partials)
+                progress_callback(progress)
+
+        # Reuse the stage results of an identical upload (same bytes, same analyzer versions)
+        if self.parallel_pipeline is not None:
+            analyzer_keys = self.parallel_pipeline.cache_keys(mode)
+        else:
+            analyzer_keys = analyzer_cache_keys(mode)
+        stage_keys = {'video': self.video_processor.cache_key(), **analyzer_keys}
+        cached = {}
+        if self.analysis_cache is not None:
+            cached = self.analysis_cache.get_stages(job['video_hash'], stage_keys)
+
+        # Step 1: Process video
+        report('processing_video', 20)
+
+        video_info = cached.get('video') or self.video_processor.process_video(video_path)
+        if not video_info['success']:
+            raise Exception(video_info['error'])
+
+        voice_results = cached.get('voice')
+        body_results = cached.get('body')
+        facial_results = cached.get('facial')
+        run_voice = voice_results is None
+        run_vision = body_results is None or facial_results is None
+        progress_step = 70 if not is_advanced else 60
+
+        if self.parallel_pipeline is not None:
+            # Steps 2-3: Voice and vision branches run concurrently, each with its own progress
+            branches = [branch for branch, needed in (('voice', run_voice), ('vision', run_vision)) if needed]
+            for branch in ('voice', 'vision'):
+                branch_progress[branch] = 0.0 if branch in branches else 1.0
+            report('analyzing_voice_prosody', 30)
+
+            def update_branch_progress(branch, fraction):
+                branch_progress[branch] = fraction
+                report('analyzing_voice_prosody', 30)
+
+            def update_partial(branch, partial):
+                partials[branch] = partial
+                report('analyzing_voice_prosody', 30)
+
+            if branches:
+                branch_results = self.parallel_pipeline.run(
+                    video_path, update_branch_progress, duration=video_info['duration'],
+                    branches=branches, mode=mode, partial_callback=update_partial
+                )
+                voice_results = branch_results.get('voice_analysis', voice_results)
+                body_results = branch_results.get('body_analysis', body_results)
+                facial_results = branch_results.get('facial_analysis', facial_results)
+
+            report('analyzing_voice_prosody', progress_step)
+        else:
+            # Step 2: Voice analysis, showing the transcription while it progresses
+            report('analyzing_voice_prosody', 40)
+
+            def update_voice_partial(update):
+                partials['voice'] = voice_partial_summary(update)
+                report('analyzing_voice_prosody', 40 + round(update['progress'] * (progress_step - 40)))
+
+            if run_voice:
+                voice_results = _get_analyzer('voice').analyze(
+                    video_path,
+                    progress_callback=lambda fraction: report(
+                        'analyzing_voice_prosody', 40 + round(fraction * (progress_step - 40))
+                    ),
+                    mode=mode,
+                    partial_callback=update_voice_partial
+                )
+
+            # Step 3: Body language and facial expression analysis (single decode pass);
+            # the progress reports also stop the decode when the job is cancelled
+            report('analyzing_body_language', progress_step)
+            if run_vision:
+                body_results, facial_results = run_frame_analyzers(
+                    video_path,
+                    [_get_analyzer('body'), _get_analyzer('facial')],
+                    progress_callback=lambda fraction: report(
+                        'analyzing_body_language', progress_step + round(fraction * (80 - progress_step))
+                    )
+                )
+
+        # Store the new stage results, failed stages are skipped by the cache
+        if self.analysis_cache is not None:
+            stage_results = {'video': video_info, 'voice': voice_results, 'body': body_results, 'facial': facial_results}
+            for stage, results in stage_results.items():
+                if stage not in cached:
+                    self.analysis_cache.put(job['video_hash'], stage, stage_keys[stage], results)
+
+        # Step 5: Content analysis (only in advanced mode)
+        content_results = None
+        if is_advanced and script_content:
+            report('analyzing_content', 80)
+
+            # Extract audio transcription from voice analysis for comparison
+            transcribed_text = voice_results.get('transcription', '')
+            content_results = self.content_analyzer.analyze_with_script(transcribed_text, script_content)
+
+        # Final step: Compile results
+        report('compiling_results', 100)
+
+        analysis_results = {
+            'timestamp': datetime.now().isoformat(),
+            'student_id': job['student_id'],
+            'student_dni': job['student_dni'],
+            'video_duration': video_info['duration'],
+            'analysis_mode': 'advanced' if is_advanced else 'simple',
+            'voice_analysis': voice_results,
+            'body_analysis': body_results,
+            'facial_analysis': facial_results,
+            'overall_score': calculate_overall_score(voice_results, body_results, facial_results)
+        }
+
+        # Add content analysis if available
+        if content_results:
+            analysis_results['content_analysis'] = content_results
+            analysis_results['script_provided'] = True
+            # Recalculate overall score including content
+            analysis_results['overall_score'] = calculate_overall_score_advanced(
+                voice_results, body_results, facial_results, content_results
+            )
+        else:
+            analysis_results['script_provided'] = False
+
+        return analysis_results
+
+
+# Runner created lazily inside each job worker process
+_job_runner = None
+
+
+def run_analysis_job(job, progress_callback=None):
+    """Job queue handler: run the analysis of a spooled upload, then delete the file"""
+    global _job_runner
+    if _job_runner is None:
+        _job_runner = AnalysisRunner()
+
+    try:
+        return _job_runner.run(job, progress_callback)
+    finally:
+        if os.path.exists(job['video_path']):
+            os.unlink(job['video_path'])
+
+
+def shutdown_analysis_jobs():
+    """Job queue worker exit: stop the branch pipeline and transcription workers of this process"""
+    from analysis.transcription import shutdown_transcription_pools
+
+    if _job_runner is not None and _job_runner.parallel_pipeline is not None:
+        _job_runner.parallel_pipeline.shutdown()
+    shutdown_transcription_pools()
+
+
+def calculate_overall_score_advanced(voice_results, body_results, facial_results, content_results):
+    """Calculate overall presentation score including content analysis"""
+    voice_score = voice_results.get('score', 0)
+    body_score = body_results.get('score', 0)
+    facial_score = facial_results.get('score', 0)
+    content_score = content_results.get('score', 0)
+
+    # Weighted average (voice 25%, body 25%, facial 20%, content 30%)
+    overall = (voice_score * 0.25) + (body_score * 0.25) + (facial_score * 0.20) + (content_score * 0.30)
+    return round(overall, 1)
+
+
+def calculate_overall_score(voice_results, body_results, facial_results):
+    """Calculate overall presentation score for simple mode"""
+    voice_score = voice_results.get('score', 0)
+    body_score = body_results.get('score', 0)
+    facial_score = facial_results.get('score', 0)
+
+    # Weighted average (voice 40%, body 35%, facial 25%)
+    overall = (voice_score * 0.4) + (body_score * 0.35) + (facial_score * 0.25)
+    return round(overall, 1)
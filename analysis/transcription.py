@@ -0,0 +1,336 @@
+import importlib.util
+import multiprocessing
+import multiprocessing.util
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from analysis.model_registry import ModelRegistry
+from analysis.vad import VoicedAudio
+from config import settings
+
+
+class TranscriptionBackend:
+    name = None
+
+    def __init__(self):
+        """Speech-to-text engine returning Whisper-style results; models are loaded lazily"""
+        self.models = ModelRegistry(self.load_model)
+
+    def cache_key(self):
+        """Engine and settings that determine the transcriptions"""
+        return self.name
+
+    def load_model(self, model_name):
+        """Load a model by size name (tiny, base, small, medium, large)"""
+        raise NotImplementedError
+
+    def transcribe(self, model, audio, language='es'):
+        """Transcribe 16 kHz mono float32 audio into 'text' and 'segments' with word timestamps"""
+        raise NotImplementedError
+
+    def set_threads(self, threads):
+        """Limit the CPU threads used for inference in this process"""
+
+
+class WhisperBackend(TranscriptionBackend):
+    name = 'whisper'
+
+    def load_model(self, model_name):
+        """Load an openai-whisper model"""
+        import whisper
+        return whisper.load_model(model_name)
+
+    def transcribe(self, model, audio, language='es'):
+        """Transcribe with openai-whisper, whose result already has the expected structure"""
+        return model.transcribe(audio, language=language, word_timestamps=True)
+
+    def set_threads(self, threads):
+        """Limit the torch threads"""
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    name = 'faster-whisper'
+
+    def __init__(self):
+        """CTranslate2 engine with quantized weights, several times faster than whisper on CPU"""
+        super().__init__()
+        self.compute_type = settings.FASTER_WHISPER_COMPUTE_TYPE
+        self.cpu_threads = 0  # 0 lets CTranslate2 pick
+
+    def cache_key(self):
+        """Engine and quantization that determine the transcriptions"""
+        return f"{self.name}-{self.compute_type}"
+
+    def load_model(self, model_name):
+        """Load a faster-whisper model on the CPU"""
+        from faster_whisper import WhisperModel
+        return WhisperModel(model_name, device='cpu', compute_type=self.compute_type, cpu_threads=self.cpu_threads)
+
+    def transcribe(self, model, audio, language='es'):
+        """Transcribe with faster-whisper and convert its segments to the whisper structure"""
+        # Segments are generated lazily, decoding happens while iterating
+        segments, info = model.transcribe(audio, language=language, word_timestamps=True)
+
+        result_segments = [
+            {
+                'id': segment.id,
+                'start': segment.start,
+                'end': segment.end,
+                'text': segment.text,
+                'avg_logprob': segment.avg_logprob,
+                'no_speech_prob': segment.no_speech_prob,
+                'words': [
+                    {'word': word.word, 'start': word.start, 'end': word.end, 'probability': word.probability}
+                    for word in segment.words or []
+                ]
+            }
+            for segment in segments
+        ]
+
+        return {
+            'text': ''.join(segment['text'] for segment in result_segments),
+            'segments': result_segments,
+            'language': info.language
+        }
+
+    def set_threads(self, threads):
+        """Threads used by the models loaded from now on"""
+        self.cpu_threads = threads
+
+
+TRANSCRIPTION_BACKENDS = {
+    WhisperBackend.name: (WhisperBackend, 'whisper'),
+    FasterWhisperBackend.name: (FasterWhisperBackend, 'faster_whisper')
+}
+
+# One instance per backend and process, so their models are shared
+_backends = {}
+
+# Worker pools kept alive between recordings, so every worker loads its model once
+_pools = {}
+
+
+def transcription_backend(name=None):
+    """Backend selected for this deployment, falling back to whisper if its engine is not installed"""
+    name = name or settings.TRANSCRIPTION_BACKEND
+    backend_class, module = TRANSCRIPTION_BACKENDS.get(name, TRANSCRIPTION_BACKENDS[WhisperBackend.name])
+    if importlib.util.find_spec(module) is None:
+        backend_class = WhisperBackend
+
+    if backend_class.name not in _backends:
+        _backends[backend_class.name] = backend_class()
+    return _backends[backend_class.name]
+
+
+def transcription_pool(backend, workers):
+    """Pool of ``workers`` transcription processes for a backend, started once per process"""
+    key = (backend.name, workers)
+    if key not in _pools:
+        if not _pools:
+            # Runs before multiprocessing joins the children of an exiting process,
+            # which would otherwise wait forever for the idle pool workers, and
+            # before the pool queues close (their finalizers use priority 10)
+            multiprocessing.util.Finalize(None, shutdown_transcription_pools, exitpriority=20)
+
+        _pools[key] = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_transcription_worker,
+            initargs=(backend.name, transcription_threads(workers))
+        )
+    return _pools[key]
+
+
+def transcription_threads(workers):
+    """CPU threads of each of ``workers`` transcription processes
+
+    Every concurrent job gets an equal share of the CPUs and, with the
+    parallel pipeline, the voice branch shares it with the vision branch
+    workers; the transcription processes split the voice branch share.
+    """
+    cpus = (os.cpu_count() or 1) // settings.JOB_WORKERS
+    if settings.PARALLEL_PIPELINE:
+        cpus //= max(2, settings.MAX_WORKERS)
+    return max(1, cpus // workers)
+
+
+def shutdown_transcription_pools():
+    """Stop the transcription worker processes started by this process"""
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def split_long_segments(segments, energy, frame_time, max_length, overlap):
+    """Cut speech segments longer than ``max_length`` at their quietest frame
+
+    Returns units (start, end, core_start, core_end): the audio range to
+    transcribe and the range whose words the unit is responsible for.
+    Consecutive pieces of a cut segment overlap by ``overlap`` seconds.
+    """
+    units = []
+    for start, end in segments:
+        core_start = start
+        while end - core_start > max_length:
+            # Quietest frame in the last quarter of the window, ideally a breath
+            low = int((core_start + 0.75 * max_length) / frame_time)
+            high = int((core_start + max_length) / frame_time)
+            window = energy[low:high]
+            cut = (low + int(np.argmin(window))) * frame_time if window.size else core_start + max_length
+
+            units.append((max(start, core_start - overlap), min(end, cut + overlap), core_start, cut))
+            core_start = cut
+
+        units.append((max(start, core_start - overlap), end, core_start, end))
+
+    return units
+
+
+def plan_chunks(units, chunk_seconds):
+    """Group consecutive units into chunks of about ``chunk_seconds`` of audio"""
+    chunks = []
+    current = []
+    length = 0.0
+
+    for unit in units:
+        # Overlapping pieces of a cut segment always go to different chunks
+        if current and (length >= chunk_seconds or unit[0] < current[-1][1]):
+            chunks.append(current)
+            current = []
+            length = 0.0
+
+        current.append(unit)
+        length += unit[1] - unit[0]
+
+    if current:
+        chunks.append(current)
+
+    return chunks
+
+
+def core_bounds(chunks):
+    """Time range owned by each chunk; neighbours meet halfway between their cores"""
+    bounds = []
+    for i, chunk in enumerate(chunks):
+        lower = -np.inf if i == 0 else (chunks[i - 1][-1][3] + chunk[0][2]) / 2
+        upper = np.inf if i == len(chunks) - 1 else (chunk[-1][3] + chunks[i + 1][0][2]) / 2
+        bounds.append((lower, upper))
+    return bounds
+
+
+def stitch_transcriptions(results, bounds):
+    """Merge chunk transcriptions, keeping each word only in the chunk that owns it"""
+    segments = []
+
+    for result, (lower, upper) in zip(results, bounds):
+        for segment in result.get('segments', []):
+            words = segment.get('words')
+            if words:
+                kept = [word for word in words if lower <= (word['start'] + word['end']) / 2 < upper]
+                if not kept:
+                    continue
+                if len(kept) < len(words):
+                    segment = dict(
+                        segment,
+                        words=kept,
+                        start=kept[0]['start'],
+                        end=kept[-1]['end'],
+                        text=''.join(word['word'] for word in kept)
+                    )
+            elif not lower <= (segment['start'] + segment['end']) / 2 < upper:
+                continue
+
+            segments.append(segment)
+
+    segments.sort(key=lambda segment: segment['start'])
+    for i, segment in enumerate(segments):
+        segment['id'] = i
+
+    return {
+        'text': ''.join(segment.get('text', '') for segment in segments).strip(),
+        'segments': segments
+    }
+
+
+def join_transcriptions(parts):
+    """Concatenate stitched chunk transcriptions that are already in timeline order"""
+    segments = [segment for part in parts for segment in part['segments']]
+    for i, segment in enumerate(segments):
+        segment['id'] = i
+
+    return {
+        'text': ''.join(segment.get('text', '') for segment in segments).strip(),
+        'segments': segments
+    }
+
+
+def iter_transcribed_chunks(audio, sr, segments, energy, frame_time, backend, model_name, workers=1,
+                            chunk_seconds=60, overlap=1.0, language='es', cancel_event=None):
+    """Transcribe audio in chunks cut at pauses, yielding (fraction done, chunk transcription)
+
+    Chunks come out in timeline order with timestamps of the original
+    recording and boundary words already deduplicated. With several workers
+    the chunks are transcribed in parallel processes and each one is yielded
+    as soon as it and all the chunks before it are done. Setting
+    ``cancel_event`` stops after the chunk in progress.
+    """
+    units = split_long_segments(segments, energy, frame_time, chunk_seconds, overlap)
+    chunks = plan_chunks(units, chunk_seconds)
+    voiced_chunks = [VoicedAudio(audio, sr, [(unit[0], unit[1]) for unit in chunk]) for chunk in chunks]
+    bounds = core_bounds(chunks)
+
+    def finish(i, result):
+        return stitch_transcriptions([voiced_chunks[i].remap_transcription(result)], [bounds[i]])
+
+    if workers == 1 or len(chunks) == 1:
+        with backend.models.use(model_name) as model:
+            for i, voiced in enumerate(voiced_chunks):
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                yield (i + 1) / len(chunks), finish(i, backend.transcribe(model, voiced.audio, language=language))
+        return
+
+    pool = transcription_pool(backend, workers)
+    futures = {}
+    try:
+        futures = {
+            pool.submit(_transcribe_chunk, backend.name, voiced.audio, model_name, language): i
+            for i, voiced in enumerate(voiced_chunks)
+        }
+        finished = {}
+        next_chunk = 0
+        for future in as_completed(futures):
+            finished[futures[future]] = future.result()
+            while next_chunk in finished:
+                yield (next_chunk + 1) / len(chunks), finish(next_chunk, finished.pop(next_chunk))
+                next_chunk += 1
+            if cancel_event is not None and cancel_event.is_set():
+                return
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory), the next recording starts a new pool
+        _pools.pop((backend.name, workers), None)
+        raise
+    finally:
+        # Chunks not started yet are dropped when the caller stops early
+        for future in futures:
+            future.cancel()
+
+
+def _init_transcription_worker(backend_name, threads):
+    """Limit the inference threads of a transcription worker"""
+    transcription_backend(backend_name).set_threads(threads)
+
+
+def _transcribe_chunk(backend_name, audio, model_name, language):
+    """Transcribe one chunk with the model of this worker process"""
+    backend = transcription_backend(backend_name)
+    with backend.models.use(model_name) as model:
+        return backend.transcribe(model, audio, language=language)
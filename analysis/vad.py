@@ -0,0 +1,89 @@
+import numpy as np
+
+
+def detect_speech(energy, sr, hop_length, top_db=35, min_silence=0.6, min_speech=0.25, padding=0.2):
+    """Speech segments (start, end) in seconds from the frame energy of a signal
+
+    Frames within ``top_db`` of the loud end of the recording count as voiced.
+    Segments are padded, pauses shorter than ``min_silence`` are bridged and
+    blips shorter than ``min_speech`` are dropped.
+    """
+    if energy.size == 0:
+        return []
+
+    # Reference slightly below the peak so a single click does not mute the rest
+    ref = np.percentile(energy, 99)
+    if ref <= 0:
+        return []
+
+    voiced = 20 * np.log10(np.maximum(energy, 1e-10) / ref) > -top_db
+
+    # Rising and falling edges of the voiced mask give the segment bounds (in frames)
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], voiced.astype(np.int8), [0]))))
+    frame_time = hop_length / sr
+    duration = energy.size * frame_time
+    starts = np.maximum(0, edges[0::2] * frame_time - padding)
+    ends = np.minimum(duration, edges[1::2] * frame_time + padding)
+
+    segments = []
+    for start, end in zip(starts, ends):
+        if segments and start - segments[-1][1] < min_silence:
+            segments[-1][1] = end
+        else:
+            segments.append([start, end])
+
+    return [(float(start), float(end)) for start, end in segments if end - start >= min_speech + 2 * padding]
+
+
+class VoicedAudio:
+    def __init__(self, audio, sr, segments, gap=0.3):
+        """Concatenate the speech segments of a signal, separated by short silences
+
+        Keeps the offsets needed to map times of the voiced audio back to
+        the original recording.
+        """
+        self.sr = sr
+        gap_samples = int(gap * sr)
+        silence = np.zeros(gap_samples, dtype=audio.dtype)
+
+        pieces = []
+        voiced_starts = []
+        original_starts = []
+        lengths = []
+        position = 0
+
+        for start, end in segments:
+            first, last = int(start * sr), min(audio.size, int(end * sr))
+            if last <= first:
+                continue
+
+            voiced_starts.append(position / sr)
+            original_starts.append(first / sr)
+            lengths.append((last - first) / sr)
+            pieces.extend([audio[first:last], silence])
+            position += last - first + gap_samples
+
+        self.audio = np.concatenate(pieces) if pieces else np.zeros(0, dtype=audio.dtype)
+        self.voiced_starts = np.array(voiced_starts)
+        self.original_starts = np.array(original_starts)
+        self.lengths = np.array(lengths)
+
+    def to_original(self, t):
+        """Map a time of the voiced audio to the original recording"""
+        if self.voiced_starts.size == 0:
+            return t
+
+        i = max(0, np.searchsorted(self.voiced_starts, t, side='right') - 1)
+        # Times inside an inserted gap stick to the end of the previous segment
+        offset = min(max(0.0, t - self.voiced_starts[i]), self.lengths[i])
+        return round(float(self.original_starts[i] + offset), 2)
+
+    def remap_transcription(self, result):
+        """Move the segment and word timestamps of a Whisper result to the original timeline"""
+        for segment in result.get('segments', []):
+            segment['start'] = self.to_original(segment.get('start', 0))
+            segment['end'] = self.to_original(segment.get('end', 0))
+            for word in segment.get('words', []):
+                word['start'] = self.to_original(word.get('start', 0))
+                word['end'] = self.to_original(word.get('end', 0))
+        return result
@@ -1,44 +1,86 @@
-import whisper
 import numpy as np
 import re
-import librosa
-from collections import Counter
-import tempfile
-import os
+from analysis.audio_features import SpectralFeatureBank, pitch_contour
+from analysis.model_registry import whisper_model_name
+from analysis.phrase_matcher import lexicon_matcher
+from analysis.transcription import iter_transcribed_chunks, join_transcriptions, transcription_backend
+from analysis.vad import detect_speech
+from analysis.word_index import WordIndex
+from config import settings
+from utils.ffmpeg_tools import read_audio
 
 class VoiceAnalyzer:
+    # Bump when a change alters the results, so cached analyses are recomputed
+    VERSION = 8
+    
     def __init__(self):
-        """Initialize the voice analyzer with Whisper model"""
-        try:
-            # Load smaller Whisper model for faster processing
-            self.model = whisper.load_model("base")
-        except Exception as e:
-            print(f"Error loading Whisper model: {e}")
-            self.model = None
+        """Initialize the voice analyzer; the transcription model is loaded on first use"""
+        # Configured speech-to-text engine, its models are shared by the whole process
+        self.backend = transcription_backend()
         
-        # Spanish filler words (muletillas)
-        self.filler_words = [
-            'eh', 'ehh', 'ehhh', 'em', 'emm', 'emmm',
-            'este', 'esta', 'esto', 'entonces', 'pues',
-            'bueno', 'o sea', 'digamos', 'como que',
-            'tipo', 'mmm', 'aaa', 'eee', 'ooo'
-        ]
+        # Audio is decoded once at the rate Whisper expects and kept in memory
+        self.sample_rate = 16000
+        
+        # Language of the speech, for transcription and the filler lexicon
+        self.language = 'es'
+        
+        # Filler words and phrases (muletillas), including multi-word ones like 'o sea'
+        self.filler_matcher = lexicon_matcher('fillers', self.language)
     
-    def analyze(self, video_path):
+    def analyze(self, video_path, progress_callback=None, mode='simple', partial_callback=None, cancel_event=None):
         """Analyze voice and prosody from video"""
+        for update in self.analyze_stream(video_path, mode, cancel_event):
+            self._report_progress(progress_callback, update['progress'])
+            if update['event'] == 'partial' and partial_callback:
+                partial_callback(update)
+            elif update['event'] == 'result':
+                return update['result']
+    
+    def analyze_stream(self, video_path, mode='simple', cancel_event=None):
+        """Analyze voice window by window, yielding updates as they become available
+        
+        Every update has an 'event' and the overall 'progress' (0-1). 'partial'
+        updates follow each transcribed window with the transcription so far,
+        running filler count and speaking rate and the confidence timeline;
+        the last update is the 'result'. Setting ``cancel_event`` stops after
+        the window in progress and returns an error result.
+        """
         
         try:
             # Extract audio from video
-            audio_path = self._extract_audio(video_path)
+            audio = self._extract_audio(video_path)
+            
+            # One spectrogram shared by voice activity detection and every spectral feature
+            features = SpectralFeatureBank(audio, self.sample_rate)
+            speech_segments = self._detect_speech(features) if settings.VAD_TRANSCRIPTION else None
+            yield {'event': 'progress', 'progress': 0.1}
+            
+            # Transcribe audio window by window
+            parts = []
+            transcription_error = None
+            try:
+                for fraction, part in self._iter_transcription(audio, whisper_model_name(mode), speech_segments,
+                                                               features, cancel_event):
+                    parts.append(part)
+                    yield self._partial_update(join_transcriptions(parts), 0.1 + 0.7 * fraction)
+                transcription_result = join_transcriptions(parts)
+            except Exception as e:
+                print(f"Error transcribing with {self.backend.name}: {e}")
+                transcription_error = str(e)
+                transcription_result = {
+                    'text': f"Error en transcripción: {str(e)}",
+                    'segments': []
+                }
             
-            # Transcribe audio
-            transcription_result = self._transcribe_audio(audio_path)
+            if cancel_event is not None and cancel_event.is_set():
+                raise Exception("Análisis cancelado")
+            yield {'event': 'progress', 'progress': 0.8}
             
             # Analyze transcription
-            text_analysis = self._analyze_text(transcription_result['text'])
+            text_analysis = self._analyze_text(transcription_result)
             
             # Analyze audio features
-            audio_analysis = self._analyze_audio_features(audio_path)
+            audio_analysis = self._analyze_audio_features(features)
             
             # Calculate overall voice score
             score = self._calculate_voice_score(text_analysis, audio_analysis)
@@ -46,129 +88,167 @@ class VoiceAnalyzer:
             # Generate feedback
             feedback = self._generate_feedback(text_analysis, audio_analysis, score)
             
-            # Clean up temporary audio file
-            os.unlink(audio_path)
-            
-            return {
+            results = {
                 'score': score,
                 'transcription': transcription_result['text'],
                 'clarity_score': audio_analysis['clarity_score'],
                 'speaking_rate': text_analysis['speaking_rate'],
                 'filler_count': text_analysis['filler_count'],
+                'filler_counts': text_analysis['filler_counts'],
+                'filler_positions': text_analysis['filler_positions'],
+                'rate_timeline': text_analysis['rate_timeline'],
+                'pause_histogram': text_analysis['pause_histogram'],
                 'word_count': text_analysis['word_count'],
+                'pitch_variation': round(audio_analysis['pitch_variation'], 1),
+                'pitch_timeline': audio_analysis['pitch_timeline'],
                 'confidence_timeline': self._create_confidence_timeline(transcription_result),
                 'feedback': feedback
             }
             
+            # The audio metrics are still shown, but the result must not be cached
+            # so the same upload can be analyzed again
+            if transcription_error:
+                results['error'] = transcription_error
+            
         except Exception as e:
-            return {
+            results = {
                 'score': 0,
                 'transcription': "",
                 'clarity_score': 0,
                 'speaking_rate': 0,
                 'filler_count': 0,
+                'filler_counts': {},
+                'filler_positions': [],
+                'rate_timeline': [],
+                'pause_histogram': [],
                 'word_count': 0,
+                'pitch_variation': 0,
+                'pitch_timeline': [],
                 'confidence_timeline': [],
-                'feedback': [f"Error en el análisis de voz: {str(e)}"]
+                'feedback': [f"Error en el análisis de voz: {str(e)}"],
+                'error': str(e)
             }
-    
-    def _extract_audio(self, video_path):
-        """Extract audio from video file"""
-        audio_path = tempfile.mktemp(suffix='.wav')
         
-        try:
-            # Use librosa to load video and extract audio
-            y, sr = librosa.load(video_path, sr=16000)
-            
-            # Save as WAV file
-            import soundfile as sf
-            sf.write(audio_path, y, sr)
-            
-            return audio_path
-            
-        except Exception:
-            # Fallback: create dummy audio file
-            import soundfile as sf
-            dummy_audio = np.zeros(16000)  # 1 second of silence
-            sf.write(audio_path, dummy_audio, 16000)
-            return audio_path
+        yield {'event': 'result', 'progress': 1.0, 'result': results}
     
-    def _transcribe_audio(self, audio_path):
-        """Transcribe audio using Whisper"""
+    def cache_key(self, mode='simple'):
+        """Version and settings that determine the results of this analyzer"""
+        parts = [f"voice-v{self.VERSION}", self.backend.cache_key(), whisper_model_name(mode)]
         
-        if self.model is None:
-            return {
-                'text': "No se pudo cargar el modelo de transcripción",
-                'segments': []
-            }
+        # Voice activity detection decides which audio is transcribed
+        if settings.VAD_TRANSCRIPTION:
+            parts.append(f"vad{settings.VAD_TOP_DB}-{settings.VAD_MIN_SILENCE}")
+        else:
+            parts.append("novad")
         
-        try:
-            result = self.model.transcribe(
-                audio_path,
-                language='es',
-                word_timestamps=True
-            )
-            return result
-            
-        except Exception as e:
-            return {
-                'text': f"Error en transcripción: {str(e)}",
-                'segments': []
-            }
+        # Chunking changes where the audio is cut and so the word timing after stitching
+        chunking = 'parallel' if settings.TRANSCRIPTION_WORKERS > 1 else 'serial'
+        parts.append(f"chunks{settings.TRANSCRIPTION_CHUNK_SECONDS}-{settings.TRANSCRIPTION_CHUNK_OVERLAP}-{chunking}")
+        
+        # Shorter recordings are transcribed in streaming windows of this length
+        parts.append(f"window{settings.VOICE_STREAM_WINDOW_SECONDS}")
+        
+        return '-'.join(parts)
+    
+    def _report_progress(self, progress_callback, fraction):
+        """Notify the caller about the progress of the analysis (0-1)"""
+        if progress_callback:
+            progress_callback(fraction)
+    
+    def _extract_audio(self, video_path):
+        """Extract the audio track as a mono float32 array, raising if there is none"""
+        return read_audio(video_path, self.sample_rate)
     
-    def _analyze_text(self, text):
-        """Analyze transcribed text for speech patterns"""
+    def _detect_speech(self, features):
+        """Speech segments (start, end) in seconds, from the frame energy"""
+        return detect_speech(
+            features.rms, features.sr, features.hop_length,
+            top_db=settings.VAD_TOP_DB, min_silence=settings.VAD_MIN_SILENCE
+        )
+    
+    def _iter_transcription(self, audio, model_name, speech_segments, features, cancel_event=None):
+        """Transcribe the speech segments (or the whole audio) window by window
         
-        # Clean and tokenize text
-        words = re.findall(r'\b\w+\b', text.lower())
+        Long recordings use chunks transcribed in parallel, shorter ones are
+        transcribed in windows of VOICE_STREAM_WINDOW_SECONDS in this process.
+        """
+        # Silences cost Whisper CPU time and are where it hallucinates text
+        if speech_segments is not None and not speech_segments:
+            return
+        segments = speech_segments or [(0.0, audio.size / self.sample_rate)]
         
-        # Count filler words
-        filler_count = sum(1 for word in words if word in self.filler_words)
+        speech_duration = sum(end - start for start, end in segments)
+        parallel = (settings.TRANSCRIPTION_WORKERS > 1
+                    and speech_duration > 1.5 * settings.TRANSCRIPTION_CHUNK_SECONDS)
+        if parallel:
+            workers, window = settings.TRANSCRIPTION_WORKERS, settings.TRANSCRIPTION_CHUNK_SECONDS
+        else:
+            workers, window = 1, settings.VOICE_STREAM_WINDOW_SECONDS or float('inf')
         
-        # Calculate speaking rate (words per minute)
-        # Assuming average video length of 2-5 minutes
-        estimated_duration = max(2, len(words) / 150)  # Rough estimate
-        speaking_rate = len(words) / estimated_duration if estimated_duration > 0 else 0
+        yield from iter_transcribed_chunks(
+            audio, self.sample_rate, segments, features.rms, features.hop_length / features.sr,
+            self.backend, model_name, workers,
+            chunk_seconds=window,
+            overlap=settings.TRANSCRIPTION_CHUNK_OVERLAP,
+            language=self.language,
+            cancel_event=cancel_event
+        )
+    
+    def _partial_update(self, transcription, progress):
+        """Running metrics of the transcription so far"""
+        words = WordIndex.from_transcription(transcription, self.filler_matcher)
+        
+        return {
+            'event': 'partial',
+            'progress': progress,
+            'transcription': transcription['text'],
+            'word_count': len(words),
+            'filler_count': words.filler_count(),
+            'speaking_rate': round(words.speaking_rate()),
+            'confidence_timeline': self._create_confidence_timeline(transcription)
+        }
+    
+    def _analyze_text(self, transcription):
+        """Analyze the transcribed words and their timing for speech patterns"""
+        
+        # One columnar index of the words answers every timing and filler query
+        words = WordIndex.from_transcription(transcription, self.filler_matcher)
+        filler_count = words.filler_count()
         
         # Analyze sentence structure
-        sentences = re.split(r'[.!?]+', text)
-        avg_sentence_length = np.mean([len(s.split()) for s in sentences if s.strip()])
+        sentences = [s for s in re.split(r'[.!?]+', transcription['text']) if s.strip()]
+        avg_sentence_length = len(words) / max(1, len(sentences))
         
         return {
             'word_count': len(words),
             'filler_count': filler_count,
             'filler_ratio': filler_count / max(1, len(words)),
-            'speaking_rate': round(speaking_rate),
+            'filler_counts': words.filler_counts(),
+            'filler_positions': words.filler_positions(),
+            'speaking_rate': round(words.speaking_rate()),
+            'rate_timeline': words.rate_timeline(),
+            'pause_histogram': words.pause_histogram(),
             'avg_sentence_length': avg_sentence_length,
-            'unique_words': len(set(words))
+            'unique_words': words.unique_words
         }
     
-    def _analyze_audio_features(self, audio_path):
+    def _analyze_audio_features(self, features):
         """Analyze audio features for clarity and prosody"""
         
         try:
-            # Load audio
-            y, sr = librosa.load(audio_path, sr=16000)
-            
             # Voice activity detection (simple energy-based)
-            energy = librosa.feature.rms(y=y)[0]
+            energy = features.rms
             voice_frames = energy > np.percentile(energy, 20)
             voice_ratio = np.sum(voice_frames) / len(voice_frames)
             
-            # Pitch analysis
-            pitches, magnitudes = librosa.core.piptrack(y=y, sr=sr)
-            pitch_values = []
-            for t in range(pitches.shape[1]):
-                index = magnitudes[:, t].argmax()
-                pitch = pitches[index, t]
-                if pitch > 0:
-                    pitch_values.append(pitch)
-            
-            pitch_variation = np.std(pitch_values) if pitch_values else 0
+            # Pitch analysis, restricted to the human voice range
+            f0, f0_times = features.pitch
+            voiced_f0 = f0[f0 > 0]
+            pitch_variation = float(np.std(voiced_f0)) if voiced_f0.size else 0
             
             # Spectral features for clarity
-            spectral_centroid = np.mean(librosa.feature.spectral_centroid(y=y, sr=sr))
-            spectral_rolloff = np.mean(librosa.feature.spectral_rolloff(y=y, sr=sr))
+            spectral_centroid = np.mean(features.spectral_centroid)
+            spectral_rolloff = np.mean(features.spectral_rolloff)
             
             # Calculate clarity score based on spectral features
             clarity_score = min(10, (spectral_centroid / 1000) + (spectral_rolloff / 2000))
@@ -176,6 +256,7 @@ class VoiceAnalyzer:
             return {
                 'voice_ratio': voice_ratio,
                 'pitch_variation': pitch_variation,
+                'pitch_timeline': pitch_contour(f0, f0_times),
                 'clarity_score': round(clarity_score, 1),
                 'spectral_centroid': spectral_centroid
             }
@@ -184,6 +265,7 @@ class VoiceAnalyzer:
             return {
                 'voice_ratio': 0.7,
                 'pitch_variation': 50,
+                'pitch_timeline': [],
                 'clarity_score': 5.0,
                 'spectral_centroid': 1000
             }
@@ -245,7 +327,8 @@ class VoiceAnalyzer:
         
         # Filler words feedback
         if text_analysis['filler_count'] > 10:
-            feedback.append("Usas demasiadas muletillas. Practica pausas conscientes en lugar de 'eh', 'este', etc.")
+            frequent = ', '.join(f"'{filler}'" for filler in list(text_analysis['filler_counts'])[:2])
+            feedback.append(f"Usas demasiadas muletillas. Practica pausas conscientes en lugar de {frequent}, etc.")
         elif text_analysis['filler_count'] > 5:
             feedback.append("Reduce el uso de muletillas para sonar más profesional.")
         else:
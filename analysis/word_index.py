@@ -0,0 +1,124 @@
+import re
+
+import numpy as np
+
+# Pause lengths (seconds) of the histogram bins; shorter gaps are ordinary word boundaries
+PAUSE_BINS = (0.25, 0.5, 1.0, 2.0, np.inf)
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+
+class WordIndex:
+    def __init__(self, starts, ends, token_ids, fillers, vocabulary, filler_phrases):
+        """Columnar index of the transcribed words
+
+        One row per word: start and end time, id of the normalized token in
+        ``vocabulary`` and the filler phrase starting at the word (1-based
+        index into ``filler_phrases``, 0 for none).
+        """
+        self.starts = starts
+        self.ends = ends
+        self.token_ids = token_ids
+        self.fillers = fillers
+        self.vocabulary = vocabulary
+        self.filler_phrases = filler_phrases
+
+    @classmethod
+    def from_transcription(cls, transcription, filler_matcher):
+        """Build the index from the word timestamps of a Whisper result"""
+        starts = []
+        ends = []
+        tokens = []
+        for segment in transcription.get('segments', []):
+            for word in segment.get('words', []):
+                # Whisper words carry spaces and punctuation, e.g. ' ¿Qué'
+                token = ''.join(_TOKEN_PATTERN.findall(word['word'].lower()))
+                if token:
+                    tokens.append(token)
+                    starts.append(word['start'])
+                    ends.append(word['end'])
+
+        vocabulary = {}
+        token_ids = np.fromiter(
+            (vocabulary.setdefault(token, len(vocabulary)) for token in tokens), dtype=np.int32, count=len(tokens)
+        )
+
+        # Fillers are matched once over the normalized words, so multi-word ones are found too
+        fillers = np.zeros(len(tokens), dtype=np.int16)
+        if tokens:
+            offsets = np.cumsum([0] + [len(token) + 1 for token in tokens[:-1]])
+            phrase_ids = {phrase: i + 1 for i, phrase in enumerate(filler_matcher.phrases)}
+            for phrase, start, _ in filler_matcher.find(' '.join(tokens)):
+                fillers[np.searchsorted(offsets, start)] = phrase_ids[phrase]
+
+        return cls(
+            np.array(starts, dtype=np.float32),
+            np.array(ends, dtype=np.float32),
+            token_ids,
+            fillers,
+            list(vocabulary),
+            filler_matcher.phrases
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def duration(self):
+        """Seconds from the first to the last word"""
+        return float(self.ends[-1] - self.starts[0]) if len(self) else 0.0
+
+    @property
+    def unique_words(self):
+        """Number of distinct words"""
+        return len(self.vocabulary)
+
+    def speaking_rate(self):
+        """Words per minute over the time the speaker talks"""
+        return len(self) / self.duration * 60 if self.duration > 0 else 0.0
+
+    def pauses(self):
+        """Silence (seconds) between every pair of consecutive words"""
+        return np.maximum(0.0, self.starts[1:] - self.ends[:-1])
+
+    def pause_histogram(self, bins=PAUSE_BINS):
+        """Number of pauses in each length bin"""
+        counts = np.histogram(self.pauses(), bins=bins)[0] if len(self) > 1 else np.zeros(len(bins) - 1, dtype=int)
+        return [
+            {'min': float(low), 'max': float(high) if np.isfinite(high) else None, 'count': int(count)}
+            for low, high, count in zip(bins[:-1], bins[1:], counts)
+        ]
+
+    def rate_timeline(self, interval=60):
+        """Words per minute in every ``interval`` seconds of the recording"""
+        if not len(self):
+            return []
+
+        buckets = (self.starts // interval).astype(np.int64)
+        counts = np.bincount(buckets)
+        bucket_times = np.arange(counts.size) * interval
+
+        # The last bucket only covers the speech up to the last word
+        covered = np.full(counts.size, float(interval))
+        covered[-1] = max(1.0, float(self.ends[-1]) - bucket_times[-1])
+        rates = counts / np.minimum(covered, interval) * 60
+
+        return [{'time': int(t), 'rate': round(float(r))} for t, r in zip(bucket_times, rates)]
+
+    def filler_count(self):
+        """Number of filler words and phrases"""
+        return int(np.count_nonzero(self.fillers))
+
+    def filler_counts(self):
+        """Occurrences of every filler used, most frequent first"""
+        counts = np.bincount(self.fillers, minlength=len(self.filler_phrases) + 1)[1:]
+        order = np.argsort(-counts, kind='stable')
+        return {self.filler_phrases[i]: int(counts[i]) for i in order if counts[i]}
+
+    def filler_positions(self):
+        """Time and phrase of every filler, in order"""
+        positions = np.flatnonzero(self.fillers)
+        return [
+            {'time': round(float(self.starts[i]), 2), 'filler': self.filler_phrases[self.fillers[i] - 1]}
+            for i in positions
+        ]
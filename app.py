@@ -1,21 +1,18 @@
 import streamlit as st
 import os
-import tempfile
 import json
-from datetime import datetime
 import pandas as pd
 
 # Import analysis modules
-from analysis.voice_analyzer import VoiceAnalyzer
-from analysis.body_language_analyzer import BodyLanguageAnalyzer
-from analysis.facial_analyzer import FacialAnalyzer
-from analysis.content_analyzer import ContentAnalyzer
+from analysis.pipeline import run_analysis_job, shutdown_analysis_jobs
 from utils.data_storage import DataStorage
-from utils.video_processor import VideoProcessor
+from utils.job_queue import JobQueue, CANCELLED, COLLECTED, FAILED, FINISHED_STATUSES, QUEUED
 from utils.report_generator import ReportGenerator
+from utils.upload_spool import spool_upload
 from visualization.charts import ChartGenerator
 from auth.user_manager import UserManager
 from config.languages import get_text, get_available_languages
+from config import settings
 
 # Configure page
 st.set_page_config(
@@ -598,19 +595,31 @@ def show_global_controls():
                 st.session_state.dark_mode = not st.session_state.dark_mode
                 st.rerun()
 
+def save_analysis_job(user_manager, job):
+    """Save the results of a finished job in the student record
+
+    Raising marks the job as failed with the error, so a lost result is
+    reported instead of silently dropped.
+    """
+    payload = job['payload']
+    if not user_manager.add_student_analysis(payload['username'], payload['student_dni'], job['result']):
+        raise Exception("No se pudo guardar el análisis del estudiante")
+
 # Initialize components
 @st.cache_resource
 def initialize_components():
+    user_manager = UserManager()
     return {
-        'voice_analyzer': VoiceAnalyzer(),
-        'body_analyzer': BodyLanguageAnalyzer(),
-        'facial_analyzer': FacialAnalyzer(),
-        'content_analyzer': ContentAnalyzer(),
         'data_storage': DataStorage(),
-        'video_processor': VideoProcessor(),
         'chart_generator': ChartGenerator(),
         'report_generator': ReportGenerator(),
-        'user_manager': UserManager()
+        'user_manager': user_manager,
+        # Analyses run in worker processes; finished results are saved from this process only
+        'job_queue': JobQueue(
+            run_analysis_job,
+            worker_exit=shutdown_analysis_jobs,
+            on_done=lambda job: save_analysis_job(user_manager, job)
+        )
     }
 
 # Initialize session state
@@ -1075,6 +1084,10 @@ def show_modern_analysis_interface(components, user, lang):
                         uploaded_file, selected_student, components, user, lang, 
                         is_advanced=is_advanced_mode, script_content=script_content
                     )
+        
+        # Progress or results of the last analysis queued in this session
+        if st.session_state.get('analysis_job'):
+            show_analysis_job_modern(st.session_state.analysis_job, selected_student, components, lang)
     
     with col2:
         st.markdown(f"### 📊 {get_text('student_progress', lang)}")
@@ -1223,117 +1236,114 @@ def show_modern_reports_interface(components, user, lang):
             st.info(f"⚠️ {get_text('no_students_with_analyses', lang)}")
 
 def analyze_presentation_modern(uploaded_file, student, components, user, lang, is_advanced=False, script_content=None):
-    """Modern analysis interface with enhanced UX and advanced mode support"""
-    
-    # Create modern progress container
-    progress_container = st.empty()
-    
-    analysis_mode = get_text('advanced_analysis', lang) if is_advanced else get_text('simple_analysis', lang)
-    
-    with progress_container.container():
-        st.markdown(f"""
-        <div class="progress-container">
-            <h3 style="color: var(--accent-primary);">🔄 {get_text('analyzing_presentation', lang)} ({analysis_mode})</h3>
-            <p style="color: var(--text-secondary); font-size: 1.1rem;">{get_text('processing_with_ai', lang)}...</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+    """Queue the analysis of an uploaded presentation in the background workers"""
     
+    video_path = None
     try:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as tmp_file:
-            tmp_file.write(uploaded_file.read())
-            video_path = tmp_file.name
-        
-        # Step 1: Process video
-        status_text.text(f"🎬 {get_text('processing_video', lang)}...")
-        progress_bar.progress(20)
-        
-        video_info = components['video_processor'].process_video(video_path)
-        if not video_info['success']:
-            st.error(f"❌ {get_text('video_processing_error', lang)}: {video_info['error']}")
-            return
-        
-        # Step 2: Voice analysis
-        status_text.text(f"🗣️ {get_text('analyzing_voice_prosody', lang)}...")
-        progress_bar.progress(40)
-        
-        voice_results = components['voice_analyzer'].analyze(video_path)
-        
-        # Step 3: Body language analysis
-        status_text.text(f"🕴️ {get_text('analyzing_body_language', lang)}...")
-        progress_bar.progress(70)
-        
-        body_results = components['body_analyzer'].analyze(video_path)
-        
-        # Step 4: Facial expression analysis
-        status_text.text(f"😊 {get_text('analyzing_facial_expressions', lang)}...")
-        progress_step = 70 if not is_advanced else 60
-        progress_bar.progress(progress_step)
-        
-        facial_results = components['facial_analyzer'].analyze(video_path)
-        
-        # Step 5: Content analysis (only in advanced mode)
-        content_results = None
-        if is_advanced and script_content:
-            status_text.text(f"📝 {get_text('analyzing_content', lang)}...")
-            progress_bar.progress(80)
-            
-            # Extract audio transcription from voice analysis for comparison
-            transcribed_text = voice_results.get('transcription', '')
-            content_results = components['content_analyzer'].analyze_with_script(
-                transcribed_text, script_content
-            )
-        
-        # Final step: Compile results
-        status_text.text(f"📊 {get_text('compiling_results', lang)}...")
-        progress_bar.progress(100)
-        
-        # Combine all results
-        analysis_results = {
-            'timestamp': datetime.now().isoformat(),
+        # Stream the upload to the scratch directory in chunks, keeping its real extension
+        video_path, video_hash = spool_upload(uploaded_file)
+        
+        # The job owns the spooled file from here on, the worker deletes it when done
+        job_id = components['job_queue'].enqueue({
+            'video_path': video_path,
+            'video_hash': video_hash,
+            'username': user['username'],
             'student_id': student['anonymous_id'],
             'student_dni': student['dni'],
-            'video_duration': video_info['duration'],
-            'analysis_mode': 'advanced' if is_advanced else 'simple',
-            'voice_analysis': voice_results,
-            'body_analysis': body_results,
-            'facial_analysis': facial_results,
-            'overall_score': calculate_overall_score(voice_results, body_results, facial_results)
-        }
-        
-        # Add content analysis if available
-        if content_results:
-            analysis_results['content_analysis'] = content_results
-            analysis_results['script_provided'] = True
-            # Recalculate overall score including content
-            analysis_results['overall_score'] = calculate_overall_score_advanced(
-                voice_results, body_results, facial_results, content_results
-            )
-        else:
-            analysis_results['script_provided'] = False
-        
-        # Save results
-        components['user_manager'].add_student_analysis(
-            user['username'], 
-            student['dni'], 
-            analysis_results
-        )
-        
-        # Clear progress and show results
-        progress_container.empty()
-        
-        st.success(f"✅ {get_text('analysis_completed_successfully', lang)}!")
-        display_modern_results(analysis_results, components, lang, is_advanced)
-        
-        # Clean up
-        os.unlink(video_path)
+            'is_advanced': is_advanced,
+            'script_content': script_content
+        })
         
     except Exception as e:
-        progress_container.empty()
+        if video_path and os.path.exists(video_path):
+            os.unlink(video_path)
         st.error(f"❌ {get_text('analysis_error', lang)}: {str(e)}")
+        return
+    
+    # Survives reruns; the analysis keeps running even if the browser is closed
+    st.session_state.analysis_job = job_id
+
+def show_analysis_job_modern(job_id, student, components, lang):
+    """Show the progress or the results of a queued analysis"""
+    
+    job = components['job_queue'].get(job_id)
+    if job is None or job['payload']['student_dni'] != student['dni']:
+        return
+    
+    if job['status'] == COLLECTED:
+        st.success(f"✅ {get_text('analysis_completed_successfully', lang)}!")
+        display_modern_results(job['result'], components, lang, job['payload']['is_advanced'])
+    elif job['status'] == FAILED:
+        # Rejected videos fail during the first stage
+        progress = job['progress'] or {}
+        error_key = 'video_processing_error' if progress.get('stage') == 'processing_video' else 'analysis_error'
+        st.error(f"❌ {get_text(error_key, lang)}: {job['error']}")
+    elif job['status'] == CANCELLED:
+        st.info(f"⏹️ {get_text('analysis_cancelled', lang)}")
+    else:
+        show_analysis_progress_modern(job_id, components, lang)
+
+@st.fragment(run_every=settings.JOB_POLL_SECONDS)
+def show_analysis_progress_modern(job_id, components, lang):
+    """Poll a queued analysis and show its progress until the results are saved"""
+    
+    job = components['job_queue'].get(job_id)
+    if job is None or job['status'] in FINISHED_STATUSES:
+        # Rerun the whole page to show the results and the updated student progress
+        st.rerun()
+    
+    analysis_mode = get_text('advanced_analysis', lang) if job['payload']['is_advanced'] else get_text('simple_analysis', lang)
+    
+    st.markdown(f"""
+    <div class="progress-container">
+        <h3 style="color: var(--accent-primary);">🔄 {get_text('analyzing_presentation', lang)} ({analysis_mode})</h3>
+        <p style="color: var(--text-secondary); font-size: 1.1rem;">{get_text('processing_with_ai', lang)}...</p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    progress = job['progress'] or {}
+    branches = progress.get('branches') or {}
+    
+    if st.button(f"⏹️ {get_text('cancel_analysis', lang)}", key=f"cancel_{job_id}"):
+        # Running jobs delete their video themselves, queued ones never reach a worker
+        video_path = job['payload']['video_path']
+        if components['job_queue'].cancel(job_id) == QUEUED and os.path.exists(video_path):
+            os.unlink(video_path)
+        st.rerun()
+    
+    if job['status'] == QUEUED:
+        st.progress(0)
+        st.text(f"⏳ {get_text('analysis_queued', lang)}: {components['job_queue'].position(job_id) + 1}")
+        return
+    
+    stage_texts = {
+        'processing_video': f"🎬 {get_text('processing_video', lang)}...",
+        'analyzing_voice_prosody': f"🗣️ {get_text('analyzing_voice_prosody', lang)}..." if not branches else
+            f"🗣️ {get_text('analyzing_voice_prosody', lang)} / 🕴️ {get_text('analyzing_body_language', lang)}...",
+        'analyzing_body_language': f"🕴️ {get_text('analyzing_body_language', lang)} / 😊 {get_text('analyzing_facial_expressions', lang)}...",
+        'analyzing_content': f"📝 {get_text('analyzing_content', lang)}...",
+        'compiling_results': f"📊 {get_text('compiling_results', lang)}..."
+    }
+    
+    st.progress(progress.get('percent', 0))
+    st.text(stage_texts.get(progress.get('stage'), f"🎬 {get_text('processing_video', lang)}..."))
+    
+    # One progress bar per branch when voice and vision run concurrently
+    branch_labels = {
+        'voice': f"🗣️ {get_text('voice_analysis', lang)}",
+        'vision': f"🕴️ {get_text('body_analysis', lang)} / 😊 {get_text('facial_analysis', lang)}"
+    }
+    for branch, fraction in branches.items():
+        st.progress(int(fraction * 100), text=branch_labels[branch])
+    
+    # Running voice metrics, updated after every transcribed window
+    voice_partial = (progress.get('partial') or {}).get('voice')
+    if voice_partial:
+        col1, col2, col3 = st.columns(3)
+        col1.metric(get_text('words_transcribed', lang), voice_partial['word_count'])
+        col2.metric(get_text('filler_words', lang), voice_partial['filler_count'])
+        col3.metric(get_text('speaking_rate', lang), voice_partial['speaking_rate'])
+        st.caption(f"📝 {get_text('live_transcription', lang)}: {voice_partial['transcription']}")
 
 def display_student_progress_modern(student, components, lang):
     """Display modern student progress"""
@@ -1751,6 +1761,27 @@ def display_charts_modern(results, components, lang='es'):
         df = pd.DataFrame([scores])
         st.bar_chart(df.T)
 
+    display_voice_charts(results['voice_analysis'], components, lang)
+
+def display_voice_charts(voice_analysis, components, lang='es'):
+    """Display intonation, speaking rate and pause charts of the voice analysis"""
+    chart_generator = components['chart_generator']
+
+    try:
+        if voice_analysis.get('pitch_timeline'):
+            st.pyplot(chart_generator.create_pitch_timeline(voice_analysis['pitch_timeline']))
+
+        if voice_analysis.get('rate_timeline'):
+            st.pyplot(chart_generator.create_speech_rate_timeline(
+                voice_analysis['rate_timeline'], voice_analysis.get('filler_positions', [])
+            ))
+
+        pause_histogram = voice_analysis.get('pause_histogram', [])
+        if any(point['count'] for point in pause_histogram):
+            st.pyplot(chart_generator.create_pause_histogram(pause_histogram))
+    except Exception as e:
+        st.warning(f"⚠️ {get_text('voice_charts_error', lang)}: {str(e)}")
+
 def display_analytics_advanced(results, lang='es'):
     """Display advanced analytics section"""
     
@@ -1972,34 +2003,7 @@ def display_charts_modern_advanced(results, components, lang='es'):
         df = pd.DataFrame([scores])
         st.bar_chart(df.T)
 
-def calculate_overall_score_advanced(voice_results, body_results, facial_results, content_results):
-    """Calculate overall presentation score including content analysis"""
-    voice_score = voice_results.get('score', 0)
-    body_score = body_results.get('score', 0)
-    facial_score = facial_results.get('score', 0)
-    content_score = content_results.get('score', 0)
-    
-    # Weighted average (voice 25%, body 25%, facial 20%, content 30%)
-    overall = (voice_score * 0.25) + (body_score * 0.25) + (facial_score * 0.20) + (content_score * 0.30)
-    return round(overall, 1)
-
-def calculate_overall_score(voice_results, body_results, facial_results):
-    """Calculate overall presentation score for simple mode"""
-    voice_score = voice_results.get('score', 0)
-    body_score = body_results.get('score', 0)
-    facial_score = facial_results.get('score', 0)
-    
-    # Weighted average (voice 40%, body 35%, facial 25%)
-    overall = (voice_score * 0.4) + (body_score * 0.35) + (facial_score * 0.25)
-    return round(overall, 1)
-    """Calculate overall presentation score"""
-    voice_score = voice_results.get('score', 0)
-    body_score = body_results.get('score', 0)
-    facial_score = facial_results.get('score', 0)
-    
-    # Weighted average (voice 40%, body 35%, facial 25%)
-    overall = (voice_score * 0.4) + (body_score * 0.35) + (facial_score * 0.25)
-    return round(overall, 1)
+    display_voice_charts(results['voice_analysis'], components, lang)
 
 def get_score_description(score, lang):
     """Get score description based on value"""
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark de resolución de inferencia para HablaPRO
+Compara MediaPipe (pose y face mesh) a resolución completa contra la
+resolución reducida configurada: tiempo por frame, deriva de landmarks
+y diferencia en las puntuaciones finales. Si el recorte facial o el
+muestreo adaptativo están activos, se comparan aparte como una variante más.
+
+Uso: python benchmark_inference.py video.mp4 [--pose-size 640] [--face-size 960]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from analysis.body_language_analyzer import BodyLanguageAnalyzer
+from analysis.facial_analyzer import FacialAnalyzer
+from config import settings
+from utils.frame_source import FrameSource, run_frame_analyzers
+
+
+class LandmarkRecorder:
+    def __init__(self, analyzer, kind, inference_size, sample_rate):
+        """Record normalized landmarks and inference time for each sampled frame"""
+        self.analyzer = analyzer
+        self.kind = kind
+        self.inference_size = inference_size
+        self.sample_rate = sample_rate
+        self.landmarks = {}
+        self.timings = []
+
+    def start(self, info):
+        """Receive the video properties before the first frame"""
+        self.info = info
+
+    def process(self, frame, timestamp):
+        """Run MediaPipe on the frame and keep its normalized landmarks"""
+        start = time.perf_counter()
+
+        if self.kind == 'pose':
+            results = self.analyzer.pose.process(frame)
+            points = results.pose_landmarks.landmark if results.pose_landmarks else None
+        else:
+            results = self.analyzer.face_mesh.process(frame)
+            points = results.multi_face_landmarks[0].landmark if results.multi_face_landmarks else None
+
+        self.timings.append(time.perf_counter() - start)
+
+        if points is not None:
+            # Face mesh landmarks carry no visibility, treat them as always visible
+            self.landmarks[timestamp] = np.array(
+                [[p.x, p.y, p.visibility if self.kind == 'pose' else 1.0] for p in points],
+                dtype=np.float32
+            )
+
+
+def landmark_drift(reference, reduced):
+    """Euclidean distance (normalized units) between matching landmarks"""
+    common = sorted(set(reference.landmarks) & set(reduced.landmarks))
+    if not common:
+        return None
+
+    # Only landmarks visible at both resolutions, occluded pose joints are guesses
+    distances = []
+    for t in common:
+        visible = (reference.landmarks[t][:, 2] > 0.5) & (reduced.landmarks[t][:, 2] > 0.5)
+        distances.append(np.linalg.norm(
+            reference.landmarks[t][visible, :2] - reduced.landmarks[t][visible, :2], axis=1
+        ))
+    distances = np.concatenate(distances)
+
+    if distances.size == 0:
+        return None
+
+    return {
+        'frames': len(common),
+        'mean': float(np.mean(distances)),
+        'p95': float(np.percentile(distances, 95)),
+        'max': float(np.max(distances))
+    }
+
+
+def print_comparison(name, reference, reduced):
+    """Print timing and drift for one MediaPipe graph"""
+    full_ms = np.mean(reference.timings) * 1000 if reference.timings else 0
+    reduced_ms = np.mean(reduced.timings) * 1000 if reduced.timings else 0
+
+    print(f"\n🔬 {name}")
+    print(f"   Resolución completa: {full_ms:.1f} ms/frame "
+          f"({len(reference.landmarks)}/{len(reference.timings)} detecciones)")
+    print(f"   Lado máximo {reduced.inference_size}px: {reduced_ms:.1f} ms/frame "
+          f"({len(reduced.landmarks)}/{len(reduced.timings)} detecciones)")
+    if full_ms > 0:
+        print(f"   Reducción de CPU: {(1 - reduced_ms / full_ms) * 100:.0f}%")
+
+    drift = landmark_drift(reference, reduced)
+    if drift:
+        print(f"   Deriva de landmarks (coordenadas normalizadas, {drift['frames']} frames): "
+              f"media {drift['mean']:.4f}, p95 {drift['p95']:.4f}, máx {drift['max']:.4f}")
+    else:
+        print("   Sin frames comparables para medir la deriva")
+
+
+def analyze_scores(video_path, pose_size, face_size):
+    """Body and facial results of the complete analysis at the given inference sizes"""
+    return run_frame_analyzers(
+        video_path, [BodyLanguageAnalyzer(inference_size=pose_size), FacialAnalyzer(inference_size=face_size)]
+    )
+
+
+def main():
+    """Función principal del benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark de resolución de inferencia")
+    parser.add_argument('video', help="Ruta del video a analizar")
+    parser.add_argument('--pose-size', type=int, default=settings.POSE_INFERENCE_SIZE or 640)
+    parser.add_argument('--face-size', type=int, default=settings.FACE_INFERENCE_SIZE or 960)
+    args = parser.parse_args()
+
+    print("⏱️  HablaPRO - Benchmark de resolución de inferencia")
+    print("=" * 50)
+
+    # Landmark drift: each graph runs on the same frames at both resolutions
+    source = FrameSource(args.video)
+    recorders = {
+        'pose_full': LandmarkRecorder(BodyLanguageAnalyzer(inference_size=0), 'pose', 0, settings.BODY_ANALYSIS_FPS),
+        'pose_reduced': LandmarkRecorder(BodyLanguageAnalyzer(inference_size=args.pose_size), 'pose', args.pose_size, settings.BODY_ANALYSIS_FPS),
+        'face_full': LandmarkRecorder(FacialAnalyzer(inference_size=0), 'face', 0, settings.FACIAL_ANALYSIS_FPS),
+        'face_reduced': LandmarkRecorder(FacialAnalyzer(inference_size=args.face_size), 'face', args.face_size, settings.FACIAL_ANALYSIS_FPS)
+    }
+    for recorder in recorders.values():
+        source.register(recorder)
+    info = source.run()
+
+    print(f"🎬 {args.video}: {info['width']}x{info['height']}, {info['fps']:.1f} fps, {info['duration']:.1f} s")
+    print_comparison("Pose", recorders['pose_full'], recorders['pose_reduced'])
+    print_comparison("Face mesh", recorders['face_full'], recorders['face_reduced'])
+
+    # Score change of the complete analysis. Face crops and adaptive sampling change
+    # which pixels and frames are inferred, so the resolution runs go without them
+    configured = {'FACE_ROI': settings.FACE_ROI, 'ADAPTIVE_SAMPLING': settings.ADAPTIVE_SAMPLING}
+    settings.FACE_ROI = False
+    settings.ADAPTIVE_SAMPLING = False
+
+    variants = {
+        'completa': (0, 0),
+        'reducida': (args.pose_size, args.face_size)
+    }
+    results = {name: analyze_scores(args.video, *sizes) for name, sizes in variants.items()}
+
+    if any(configured.values()):
+        for name, value in configured.items():
+            setattr(settings, name, value)
+        enabled = [name for name, value in configured.items() if value]
+        results[f"reducida + {' + '.join(enabled)}"] = analyze_scores(args.video, args.pose_size, args.face_size)
+
+    print(f"\n📊 Puntuaciones ({' → '.join(results)})")
+    for key in ['score', 'posture_stability', 'movement_score', 'gesture_count']:
+        print(f"   Corporal {key}: {' → '.join(str(body[key]) for body, _ in results.values())}")
+    for key in ['score', 'eye_contact_score', 'confidence_score', 'smile_count', 'blink_rate']:
+        print(f"   Facial {key}: {' → '.join(str(facial[key]) for _, facial in results.values())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -266,9 +266,15 @@ LANGUAGES = {
             "analyzing_voice_prosody": "Analizando voz y prosodia",
             "analyzing_body_language": "Analizando lenguaje corporal",
             "analyzing_facial_expressions": "Analizando expresiones faciales",
+            "voice_charts_error": "No se pudieron generar los gráficos de voz",
             "video_processing_error": "Error procesando video",
             "processing_with_ai": "Procesando con inteligencia artificial",
-            "analysis_completed_successfully": "Análisis completado exitosamente"
+            "analysis_completed_successfully": "Análisis completado exitosamente",
+            "analysis_queued": "Análisis en cola, posición",
+            "cancel_analysis": "Cancelar análisis",
+            "analysis_cancelled": "Análisis cancelado",
+            "live_transcription": "Transcripción en curso",
+            "words_transcribed": "Palabras transcritas"
         }
     },
     "en": {
@@ -493,9 +499,15 @@ LANGUAGES = {
             "analyzing_voice_prosody": "Analyzing voice and prosody",
             "analyzing_body_language": "Analyzing body language",
             "analyzing_facial_expressions": "Analyzing facial expressions",
+            "voice_charts_error": "Voice charts could not be generated",
             "video_processing_error": "Video processing error",
             "processing_with_ai": "Processing with artificial intelligence",
-            "analysis_completed_successfully": "Analysis completed successfully"
+            "analysis_completed_successfully": "Analysis completed successfully",
+            "analysis_queued": "Analysis queued, position",
+            "cancel_analysis": "Cancel analysis",
+            "analysis_cancelled": "Analysis cancelled",
+            "live_transcription": "Live transcription",
+            "words_transcribed": "Words transcribed"
         }
     },
     "qu": {
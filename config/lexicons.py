@@ -0,0 +1,108 @@
+"""Word and phrase lexicons used by voice and content analysis, per language"""
+
+LEXICONS = {
+    # Filler words and phrases (muletillas)
+    "fillers": {
+        "es": [
+            "eh", "ehh", "ehhh", "em", "emm", "emmm",
+            "este", "esta", "esto", "entonces", "pues",
+            "bueno", "o sea", "digamos", "como que",
+            "tipo", "mmm", "aaa", "eee", "ooo"
+        ],
+        "en": [
+            "uh", "uhh", "um", "umm", "er", "erm", "ah", "hmm",
+            "like", "you know", "i mean", "kind of", "sort of",
+            "basically", "actually", "literally", "so yeah"
+        ]
+    },
+
+    # Transition words and logical connectors
+    "transitions": {
+        "es": [
+            "además", "por otro lado", "sin embargo", "por lo tanto",
+            "en consecuencia", "finalmente", "en primer lugar", "segundo",
+            "también", "asimismo", "no obstante", "por consiguiente",
+            "en resumen", "para concluir", "en definitiva"
+        ],
+        "en": [
+            "furthermore", "however", "therefore", "consequently",
+            "finally", "first", "second", "also", "moreover",
+            "nevertheless", "thus", "in conclusion", "to summarize"
+        ]
+    },
+
+    # Greetings and self-introductions, expected at the start
+    "introduction": {
+        "es": [
+            "buenos días", "buenas tardes", "hola", "mi nombre es",
+            "me llamo", "soy", "presentar", "hablar sobre"
+        ],
+        "en": [
+            "good morning", "good afternoon", "hello", "my name is",
+            "i am", "introduce", "talk about"
+        ]
+    },
+
+    # Statements of the goal of the presentation
+    "objectives": {
+        "es": ["objetivo", "meta", "propósito", "vamos a ver", "explicaré"],
+        "en": ["objective", "goal", "purpose", "we will see", "i will explain"]
+    },
+
+    # Closing phrases, expected at the end
+    "conclusion": {
+        "es": [
+            "en conclusión", "para terminar", "finalmente", "resumiendo",
+            "para concluir", "en resumen"
+        ],
+        "en": ["in conclusion", "to finish", "finally", "to summarize", "in summary"]
+    },
+
+    # Words that order the points of the talk
+    "sequence": {
+        "es": ["primero", "segundo", "tercero", "luego", "después", "finalmente"],
+        "en": ["first", "second", "then", "finally"]
+    },
+
+    # Introductions of examples
+    "examples": {
+        "es": ["por ejemplo", "como", "tal como"],
+        "en": ["for example", "such as"]
+    },
+
+    # Emphasis on key ideas
+    "emphasis": {
+        "es": ["importante", "clave", "fundamental", "esencial", "crucial"],
+        "en": ["important", "key", "essential"]
+    },
+
+    # References to the audience and its participation
+    "engagement": {
+        "es": ["ustedes", "pregunta", "opinión"],
+        "en": ["you", "question", "opinion"]
+    },
+
+    # Announcements of a new part of the talk
+    "sections": {
+        "es": ["parte", "sección", "punto", "tema"],
+        "en": ["part", "section", "point"]
+    },
+
+    # Direct address to the audience
+    "direct_address": {
+        "es": ["ustedes", "vosotros", "tú", "usted"],
+        "en": ["you"]
+    },
+
+    # Calls to action
+    "action_verbs": {
+        "es": ["piensen", "imaginen", "consideren", "recuerden"],
+        "en": ["think", "imagine", "consider", "remember"]
+    }
+}
+
+
+def get_lexicon(name, language="es"):
+    """Get the phrases of a lexicon for one language, falling back to Spanish"""
+    lexicon = LEXICONS[name]
+    return lexicon.get(language, lexicon["es"])
@@ -0,0 +1,132 @@
+"""Deployment settings for HablaPRO, read from environment variables"""
+
+import os
+import tempfile
+
+
+def _get_bool(name, default):
+    """Read a boolean flag from the environment"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _get_float(name, default):
+    """Read a float from the environment"""
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def _get_int(name, default):
+    """Read an integer from the environment"""
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Run the voice (Whisper) and vision (MediaPipe) branches in separate processes
+PARALLEL_PIPELINE = _get_bool('PARALLEL_PIPELINE', True)
+
+# Number of worker processes for parallel processing
+MAX_WORKERS = max(1, _get_int('MAX_WORKERS', 4))
+
+# Videos longer than this (seconds) are split into segments analyzed in parallel
+VIDEO_SEGMENT_SECONDS = _get_int('VIDEO_SEGMENT_SECONDS', 120)
+
+# Frames per second sampled for analysis, independent of the source frame rate
+ANALYSIS_FPS = _get_float('ANALYSIS_FPS', 5)
+BODY_ANALYSIS_FPS = _get_float('BODY_ANALYSIS_FPS', ANALYSIS_FPS)
+FACIAL_ANALYSIS_FPS = _get_float('FACIAL_ANALYSIS_FPS', ANALYSIS_FPS * 2)
+
+# Infer every sampled frame only while the picture moves; on still stretches infer
+# ADAPTIVE_STATIC_FPS frames per second and reuse the last landmarks in between
+ADAPTIVE_SAMPLING = _get_bool('ADAPTIVE_SAMPLING', True)
+ADAPTIVE_STATIC_FPS = _get_float('ADAPTIVE_STATIC_FPS', 1)
+
+# Gray level change (0-255) of some region of a frame thumbnail that counts as motion
+ADAPTIVE_MOTION_THRESHOLD = max(0.0, _get_float('ADAPTIVE_MOTION_THRESHOLD', 6))
+
+# Longest side (pixels) of the frames given to MediaPipe, 0 for full resolution
+POSE_INFERENCE_SIZE = max(0, _get_int('POSE_INFERENCE_SIZE', 640))
+FACE_INFERENCE_SIZE = max(0, _get_int('FACE_INFERENCE_SIZE', 960))
+
+# Run FaceMesh on a crop around the head found by the pose model, upscaled to
+# FACE_ROI_SIZE pixels, instead of on the whole frame
+FACE_ROI = _get_bool('FACE_ROI', True)
+FACE_ROI_SIZE = max(64, _get_int('FACE_ROI_SIZE', 320))
+
+# Frame decoder: "opencv" (cv2.VideoCapture) or "ffmpeg" (rawvideo pipe, needs ffmpeg installed)
+FRAME_SOURCE_BACKEND = os.environ.get('FRAME_SOURCE_BACKEND', 'opencv').strip().lower()
+
+# Validate uploads from container metadata and a few low resolution keyframes (needs ffmpeg)
+FAST_VIDEO_VALIDATION = _get_bool('FAST_VIDEO_VALIDATION', True)
+
+# Longest side (pixels) of the frames used by the video quality check
+VALIDATION_FRAME_SIZE = max(160, _get_int('VALIDATION_FRAME_SIZE', 480))
+
+# Longest side (pixels) of the frames searched for faces by the quality check (0 = full resolution);
+# the face detector misses faces under 24 pixels
+VALIDATION_FACE_SIZE = max(0, _get_int('VALIDATION_FACE_SIZE', 960))
+
+# Reuse the per-stage results of an identical upload, keyed by the file hash
+ANALYSIS_CACHE = _get_bool('ANALYSIS_CACHE', True)
+ANALYSIS_CACHE_DIR = os.environ.get('ANALYSIS_CACHE_DIR', os.path.join('data', 'cache'))
+
+# Size limit (MB) of the analysis cache, least recently used entries are evicted first
+MAX_CACHE_SIZE = max(1, _get_int('MAX_CACHE_SIZE', 1000))
+
+# Uploads are streamed to this directory in chunks instead of being copied in memory
+UPLOAD_SCRATCH_DIR = os.environ.get('UPLOAD_SCRATCH_DIR') or tempfile.gettempdir()
+UPLOAD_CHUNK_SIZE_MB = max(1, _get_int('UPLOAD_CHUNK_SIZE_MB', 8))
+
+# Memory ceiling (MB) of the copy buffers of all the uploads spooled at the same time
+UPLOAD_SPOOL_MEMORY_MB = max(UPLOAD_CHUNK_SIZE_MB, _get_int('UPLOAD_SPOOL_MEMORY_MB', 64))
+
+# Local job queue: analyses run in background worker processes, state kept in SQLite
+JOB_QUEUE_DB = os.environ.get('JOB_QUEUE_DB', os.path.join('data', 'jobs.db'))
+JOB_WORKERS = max(1, _get_int('JOB_WORKERS', 2))
+JOB_POLL_SECONDS = max(0.2, _get_float('JOB_POLL_SECONDS', 1))
+
+# Hours finished jobs are kept in the queue database
+JOB_RETENTION_HOURS = max(1, _get_int('JOB_RETENTION_HOURS', 24))
+
+# Whisper model size (tiny, base, small, medium, large) for each analysis mode
+WHISPER_MODEL = os.environ.get('WHISPER_MODEL', 'base')
+WHISPER_MODEL_SIMPLE = os.environ.get('WHISPER_MODEL_SIMPLE') or WHISPER_MODEL
+WHISPER_MODEL_ADVANCED = os.environ.get('WHISPER_MODEL_ADVANCED') or WHISPER_MODEL
+
+# Seconds an unused Whisper model stays loaded, 0 to keep it for the life of the process
+WHISPER_MODEL_TTL = max(0, _get_int('WHISPER_MODEL_TTL', 900))
+
+# Speech-to-text engine: "whisper" (openai-whisper) or "faster-whisper" (quantized CPU
+# inference, needs the faster-whisper package; falls back to whisper if not installed)
+TRANSCRIPTION_BACKEND = os.environ.get('TRANSCRIPTION_BACKEND', 'whisper').strip().lower()
+
+# Weight quantization of faster-whisper models: int8, int8_float32, float32...
+FASTER_WHISPER_COMPUTE_TYPE = os.environ.get('FASTER_WHISPER_COMPUTE_TYPE', 'int8').strip().lower()
+
+# Transcribe only the speech segments found by energy-based voice activity detection
+VAD_TRANSCRIPTION = _get_bool('VAD_TRANSCRIPTION', True)
+
+# Frames quieter than this (dB below the loud end of the recording) count as silence
+VAD_TOP_DB = _get_float('VAD_TOP_DB', 35)
+
+# Pauses shorter than this (seconds) are kept inside the surrounding speech segment
+VAD_MIN_SILENCE = _get_float('VAD_MIN_SILENCE', 0.6)
+
+# Worker processes for transcribing long recordings in parallel chunks, 1 to disable
+TRANSCRIPTION_WORKERS = max(1, _get_int('TRANSCRIPTION_WORKERS', 2))
+
+# Target length (seconds) of the parallel chunks; shorter recordings (under 1.5 chunks) use one process
+TRANSCRIPTION_CHUNK_SECONDS = max(15, _get_int('TRANSCRIPTION_CHUNK_SECONDS', 90))
+
+# Seconds shared by neighbouring chunks when speech has to be cut without a pause
+TRANSCRIPTION_CHUNK_OVERLAP = max(0.0, _get_float('TRANSCRIPTION_CHUNK_OVERLAP', 1.0))
+
+# Seconds of speech per window when transcribing in this process, so partial results
+# reach the progress view while the voice analysis runs; 0 transcribes in one piece
+VOICE_STREAM_WINDOW_SECONDS = max(0, _get_int('VOICE_STREAM_WINDOW_SECONDS', 30))
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from analysis.facial_analyzer import (
+    FacialAnalyzer, FacialConsumer, empty_face_points, LEFT_EYE_POINTS, RIGHT_EYE_POINTS
+)
+
+SAMPLE_RATE = 10
+DURATION = 60
+
+# First frame of every two-frame blink. The sparse schedule below infers the first
+# two frames of each second, so it only sees the blinks starting on the second one
+SEEN_BY_SPARSE = [11, 101, 251, 401]
+MISSED_BY_SPARSE = [35, 157, 322, 478, 533]
+
+
+class StaticScheduler:
+    """Motion scheduler of a still video: one inference per second"""
+
+    def __init__(self):
+        self.frames = 0
+
+    def should_infer(self, frame, timestamp):
+        self.frames += 1
+        return (self.frames - 1) % SAMPLE_RATE == 0
+
+
+def face_points(eye_opening):
+    """Landmarks of one frame whose eyes have an aspect ratio of ``eye_opening``"""
+    points = empty_face_points(1)[0]
+    eye = np.array([
+        [0, 0], [0.33, eye_opening / 2], [0.66, eye_opening / 2],
+        [1, 0], [0.66, -eye_opening / 2], [0.33, -eye_opening / 2]
+    ]) * 30
+    points[LEFT_EYE_POINTS, :2] = eye
+    points[RIGHT_EYE_POINTS, :2] = eye + [60, 0]
+    return points
+
+
+def scheduled_eyes():
+    """Whether the eyes are closed in every sampled frame"""
+    closed = np.zeros(DURATION * SAMPLE_RATE, dtype=bool)
+    for onset in SEEN_BY_SPARSE + MISSED_BY_SPARSE:
+        closed[onset:onset + 2] = True
+    return closed
+
+
+@pytest.fixture(scope='module')
+def analyzer():
+    return FacialAnalyzer(sample_rate=SAMPLE_RATE)
+
+
+def count_blinks(analyzer, monkeypatch, scheduler):
+    """Blinks and seconds observed by a facial consumer fed the scheduled frames"""
+    open_points, closed_points = face_points(0.3), face_points(0.1)
+
+    # Every frame carries whether its eyes are closed, so a single fake inference serves all
+    def process_frame(rgb_frame, *args):
+        return closed_points if rgb_frame[0, 0, 0] else open_points
+
+    counted = []
+    count = analyzer._count_blinks
+
+    def record_count(*args):
+        counted.append(count(*args))
+        return counted[-1]
+
+    monkeypatch.setattr(analyzer, '_process_frame', process_frame)
+    monkeypatch.setattr(analyzer, '_count_blinks', record_count)
+
+    consumer = FacialConsumer(analyzer)
+    monkeypatch.setattr(consumer, 'scheduler', scheduler)
+    consumer.start({'duration': DURATION, 'width': 640, 'height': 480})
+
+    for i, is_closed in enumerate(scheduled_eyes()):
+        consumer.process(np.full((8, 8, 3), is_closed, dtype=np.uint8), i / SAMPLE_RATE)
+
+    results = consumer.finish()
+    assert 'error' not in results
+    assert len(counted) == 1
+
+    blinks, seconds = counted[0]
+    assert results['blink_rate'] == round(blinks / seconds * 60, 1)
+    return blinks, seconds
+
+
+def test_dense_inference_counts_every_blink(analyzer, monkeypatch):
+    blinks, seconds = count_blinks(analyzer, monkeypatch, None)
+
+    assert blinks == len(SEEN_BY_SPARSE) + len(MISSED_BY_SPARSE)
+    assert seconds == pytest.approx(DURATION - 1 / SAMPLE_RATE)
+
+
+def test_sparse_inference_counts_only_blinks_between_inferred_frames(analyzer, monkeypatch):
+    blinks, seconds = count_blinks(analyzer, monkeypatch, StaticScheduler())
+
+    # Each second only the interval between its two inferred frames is observed
+    assert blinks == len(SEEN_BY_SPARSE)
+    assert seconds == pytest.approx(DURATION / SAMPLE_RATE)
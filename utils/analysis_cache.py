@@ -0,0 +1,106 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+
+
+class AnalysisCache:
+    def __init__(self, cache_dir="data/cache", max_size_mb=1000):
+        """Initialize the content-addressed cache of per-stage analysis results"""
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_size = max_size_mb * 1024 * 1024
+
+    def get(self, video_hash, stage, config_key):
+        """Return the cached results of a stage, or None on a miss"""
+        entry = self._entry_path(video_hash, stage, config_key)
+
+        try:
+            with open(entry, 'r', encoding='utf-8') as f:
+                results = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Touch the entry so eviction removes the least recently used ones first
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+
+        return results
+
+    def get_stages(self, video_hash, config_keys):
+        """Return the cached results for each stage in ``config_keys`` that is available"""
+        cached = {}
+        for stage, config_key in config_keys.items():
+            results = self.get(video_hash, stage, config_key)
+            if results is not None:
+                cached[stage] = results
+        return cached
+
+    def put(self, video_hash, stage, config_key, results):
+        """Store the results of a stage; failed analyses are never cached"""
+        if not results or results.get('error'):
+            return False
+
+        entry = self._entry_path(video_hash, stage, config_key)
+        entry.parent.mkdir(exist_ok=True)
+        tmp_entry = entry.with_suffix('.tmp')
+
+        try:
+            # Write to a temporary file first so readers never see partial entries
+            with open(tmp_entry, 'w', encoding='utf-8') as f:
+                json.dump(results, f, ensure_ascii=False, default=json_default)
+            os.replace(tmp_entry, entry)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Error caching {stage} results: {e}")
+            try:
+                tmp_entry.unlink()
+            except OSError:
+                pass
+            return False
+
+        self._evict()
+        return True
+
+    def _entry_path(self, video_hash, stage, config_key):
+        """File of a cache entry: video hash + stage + analyzer version/config"""
+        config_hash = hashlib.sha256(config_key.encode('utf-8')).hexdigest()[:16]
+        return self.cache_dir / video_hash[:2] / f"{video_hash}_{stage}_{config_hash}.json"
+
+    def _evict(self):
+        """Delete least recently used entries until the cache fits its size limit"""
+        entries = []
+        total_size = 0
+
+        for entry in self.cache_dir.glob("*/*.json"):
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total_size += stat.st_size
+
+        if total_size <= self.max_size:
+            return
+
+        entries.sort()
+        for _, size, entry in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                entry.unlink()
+                total_size -= size
+            except OSError:
+                continue
+
+
+def json_default(value):
+    """Convert NumPy values found in analysis results to JSON types"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
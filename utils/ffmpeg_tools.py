@@ -0,0 +1,118 @@
+import json
+import shutil
+import subprocess
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
+
+def ffmpeg_available():
+    """Check whether the ffmpeg and ffprobe binaries are installed"""
+    return shutil.which('ffmpeg') is not None and shutil.which('ffprobe') is not None
+
+
+@lru_cache(maxsize=None)
+def passthrough_args():
+    """Arguments that keep the decoded frame timing as is, for the installed ffmpeg
+
+    ``-fps_mode`` only exists since ffmpeg 5.1; older releases (e.g. the 4.x of
+    Ubuntu 22.04 and Debian 11) use ``-vsync 0``.
+    """
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-h', 'long'], capture_output=True, text=True, timeout=10
+        )
+        if '-fps_mode' in result.stdout:
+            return ('-fps_mode', 'passthrough')
+    except (OSError, subprocess.SubprocessError):
+        pass
+    return ('-vsync', '0')
+
+
+def probe_video(video_path):
+    """Read video properties from the container metadata with ffprobe"""
+    result = subprocess.run(
+        [
+            'ffprobe', '-v', 'error',
+            '-select_streams', 'v:0',
+            '-show_entries', 'stream=width,height,avg_frame_rate,r_frame_rate,nb_frames,duration:'
+                             'stream_side_data=rotation:stream_tags=rotate:format=duration',
+            '-of', 'json',
+            video_path
+        ],
+        capture_output=True, text=True, check=True
+    )
+
+    data = json.loads(result.stdout)
+    if not data.get('streams'):
+        raise Exception("El archivo no contiene una pista de video")
+
+    stream = data['streams'][0]
+
+    fps = _parse_rate(stream.get('avg_frame_rate')) or _parse_rate(stream.get('r_frame_rate'))
+    duration = _parse_float(stream.get('duration')) or _parse_float(data.get('format', {}).get('duration'))
+    total_frames = int(_parse_float(stream.get('nb_frames')) or round(duration * fps))
+
+    width = int(stream.get('width', 0))
+    height = int(stream.get('height', 0))
+
+    # ffmpeg auto-rotates phone videos, report the size of the rotated frames
+    rotation = _parse_float(stream.get('tags', {}).get('rotate'))
+    for side_data in stream.get('side_data_list', []):
+        rotation = _parse_float(side_data.get('rotation')) or rotation
+    if int(abs(rotation)) % 180 == 90:
+        width, height = height, width
+
+    return {
+        'fps': fps,
+        'total_frames': total_frames,
+        'width': width,
+        'height': height,
+        'duration': duration
+    }
+
+
+def read_audio(video_path, sample_rate=16000):
+    """Decode the audio track to a mono float32 array in a single ffmpeg pass"""
+    if shutil.which('ffmpeg') is None:
+        raise Exception("ffmpeg no está instalado, no se puede extraer el audio")
+
+    result = subprocess.run(
+        [
+            'ffmpeg', '-nostdin', '-v', 'error',
+            '-i', video_path,
+            '-map', '0:a:0', '-vn',
+            '-ac', '1', '-ar', str(sample_rate),
+            '-f', 'f32le', 'pipe:1'
+        ],
+        capture_output=True
+    )
+
+    if result.returncode != 0:
+        if b'matches no streams' in result.stderr:
+            raise Exception("El video no contiene una pista de audio")
+        raise Exception(f"No se pudo extraer el audio: {result.stderr.decode(errors='replace').strip()}")
+
+    # Copy into a writable array, Whisper builds a torch tensor on top of it
+    audio = np.frombuffer(result.stdout, dtype=np.float32).copy()
+    if audio.size == 0:
+        raise Exception("La pista de audio está vacía")
+
+    return audio
+
+
+def _parse_rate(value):
+    """Parse an ffprobe rate such as '30000/1001'"""
+    try:
+        return float(Fraction(value))
+    except (TypeError, ValueError, ZeroDivisionError):
+        return 0.0
+
+
+def _parse_float(value):
+    """Parse an optional numeric ffprobe field"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
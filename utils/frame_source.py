@@ -0,0 +1,372 @@
+import math
+import subprocess
+import tempfile
+
+import cv2
+import numpy as np
+
+from config import settings
+from utils.ffmpeg_tools import ffmpeg_available, probe_video
+
+
+class FrameSource:
+    def __init__(self, video_path, start_time=0, end_time=None):
+        """Decode a video once and share its frames between several consumers
+
+        ``start_time`` and ``end_time`` (seconds) restrict decoding to one
+        segment of the video, so segments can be analyzed in parallel.
+        """
+        self.video_path = video_path
+        self.start_time = max(0, start_time)
+        self.end_time = end_time
+        self.consumers = []
+
+    def register(self, consumer, sample_rate=None, inference_size=None, crops_full_frame=None):
+        """Register a consumer that receives ``sample_rate`` frames per second of video
+
+        Frames are delivered as RGB images whose longest side is at most
+        ``inference_size`` pixels (full resolution when it is not set). With
+        ``crops_full_frame`` the consumer also gets the full resolution frame
+        as a FullFrame, ``process(frame, timestamp, full_frame)``.
+        """
+        if sample_rate is None:
+            sample_rate = getattr(consumer, 'sample_rate', None)
+        if inference_size is None:
+            inference_size = getattr(consumer, 'inference_size', None)
+        if crops_full_frame is None:
+            crops_full_frame = getattr(consumer, 'crops_full_frame', False)
+
+        # A missing or non-positive rate means every decoded frame
+        interval = 1.0 / sample_rate if sample_rate and sample_rate > 0 else 0
+        self.consumers.append((consumer, interval, inference_size or 0, crops_full_frame))
+        return consumer
+
+    def run(self, progress_callback=None):
+        """Decode the video and dispatch timestamped frames to all consumers"""
+        cap = cv2.VideoCapture(self.video_path)
+
+        if not cap.isOpened():
+            raise Exception("No se pudo abrir el video")
+
+        try:
+            info = self._read_info(cap)
+
+            for consumer, _, _, _ in self.consumers:
+                consumer.start(info)
+
+            fps = info['fps']
+            end_time = self.end_time if self.end_time is not None else info['duration']
+            segment_length = max(1e-6, end_time - self.start_time)
+
+            frame_index = 0
+            if self.start_time > 0:
+                cap.set(cv2.CAP_PROP_POS_MSEC, self.start_time * 1000)
+                frame_index = int(round(self.start_time * fps))
+
+            # Half a frame of tolerance so e.g. 10 samples/s on 30 fps picks every 3rd frame
+            tolerance = 0.5 / fps if fps > 0 else 0
+
+            next_sample_times = self._initial_sample_times()
+            last_progress = 0
+
+            while True:
+                # grab() advances the stream without retrieving the pixels of the frame
+                if not cap.grab():
+                    break
+
+                timestamp = self._frame_timestamp(cap, frame_index, fps)
+                frame_index += 1
+
+                if self.end_time is not None and timestamp >= self.end_time:
+                    break
+
+                # Seeking may land slightly before the requested start
+                if timestamp + tolerance < self.start_time:
+                    continue
+
+                due = self._due_consumers(timestamp, tolerance, next_sample_times)
+
+                # Only frames that some consumer needs are converted to BGR images
+                if due:
+                    ret, frame = cap.retrieve()
+                    if ret:
+                        # Resize + RGB conversion is done once per frame and size
+                        prepared = {}
+                        for consumer, inference_size, crops_full_frame in due:
+                            if inference_size not in prepared:
+                                prepared[inference_size] = prepare_frame(frame, inference_size)
+                            if crops_full_frame:
+                                consumer.process(prepared[inference_size], timestamp, FullFrame(frame, bgr=True))
+                            else:
+                                consumer.process(prepared[inference_size], timestamp)
+
+                # Report progress roughly once per second of video
+                if progress_callback and timestamp - last_progress >= 1.0:
+                    last_progress = timestamp
+                    progress_callback(min(1.0, (timestamp - self.start_time) / segment_length))
+
+            return info
+
+        finally:
+            cap.release()
+
+    def _initial_sample_times(self):
+        """First sample time of each consumer"""
+        # Sample times lie on a grid anchored at 0, so segments line up with a full pass
+        return [
+            math.ceil(self.start_time / interval - 1e-6) * interval if interval > 0 else self.start_time
+            for _, interval, _, _ in self.consumers
+        ]
+
+    def _due_consumers(self, timestamp, tolerance, next_sample_times):
+        """Consumers that should receive the frame at ``timestamp``"""
+        due = []
+        for i, (consumer, interval, inference_size, crops_full_frame) in enumerate(self.consumers):
+            if timestamp + tolerance >= next_sample_times[i]:
+                due.append((consumer, inference_size, crops_full_frame))
+                next_sample_times[i] += interval
+                if next_sample_times[i] <= timestamp:
+                    # Catch up after gaps in the container timestamps
+                    next_sample_times[i] = timestamp + interval
+        return due
+
+    def _frame_timestamp(self, cap, frame_index, fps):
+        """Presentation time (seconds) of the last grabbed frame"""
+        position_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+
+        # Some backends do not expose container timestamps, fall back to the frame index
+        if position_ms <= 0 and frame_index > 0:
+            return frame_index / fps if fps > 0 else 0
+
+        return position_ms / 1000.0
+
+    def _read_info(self, cap):
+        """Read basic video properties from an open capture"""
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        return {
+            'fps': fps,
+            'total_frames': total_frames,
+            'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            'duration': total_frames / fps if fps > 0 else 0
+        }
+
+
+class FFmpegFrameSource(FrameSource):
+    """FrameSource backed by an ffmpeg subprocess writing raw RGB frames to a pipe
+
+    ffmpeg drops frames down to the highest consumer sample rate and scales
+    them to the largest inference size inside its multithreaded decoder, so
+    Python only sees the frames that are actually analyzed.
+    """
+
+    def run(self, progress_callback=None):
+        """Decode the video with ffmpeg and dispatch timestamped frames to all consumers"""
+        try:
+            info = probe_video(self.video_path)
+        except Exception:
+            raise Exception("No se pudo abrir el video")
+
+        for consumer, _, _, _ in self.consumers:
+            consumer.start(info)
+
+        # Decode at the highest sample rate and largest size any consumer needs;
+        # crops of the full resolution frame need it decoded at full resolution
+        intervals = [interval for _, interval, _, _ in self.consumers]
+        output_fps = 1.0 / min(intervals) if intervals and min(intervals) > 0 else info['fps']
+
+        # The fps filter lays the frames on a constant grid, so frame_index / output_fps
+        # is their time even for variable frame rate sources; it never outputs more
+        # frames per second than the source has, which would only duplicate them
+        if info['fps'] > 0:
+            output_fps = min(output_fps, info['fps']) if output_fps else info['fps']
+        sizes = [
+            0 if crops_full_frame else inference_size
+            for _, _, inference_size, crops_full_frame in self.consumers
+        ]
+        max_size = 0 if not sizes or 0 in sizes else max(sizes)
+        width, height = scaled_size(info['width'], info['height'], max_size)
+
+        end_time = self.end_time if self.end_time is not None else info['duration']
+        segment_length = max(1e-6, end_time - self.start_time)
+
+        command = ['ffmpeg', '-v', 'error', '-nostdin']
+        if self.start_time > 0:
+            command += ['-ss', f'{self.start_time:.3f}']
+        command += ['-i', self.video_path]
+        if self.end_time is not None:
+            command += ['-t', f'{self.end_time - self.start_time:.3f}']
+
+        filters = []
+        if output_fps:
+            filters.append(f'fps={output_fps:.6f}')
+        if (width, height) != (info['width'], info['height']):
+            filters.append(f'scale={width}:{height}:flags=area')
+        if filters:
+            command += ['-vf', ','.join(filters)]
+
+        command += ['-an', '-sn', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1']
+
+        # One preallocated buffer, every frame is read into it in place
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame_bytes = memoryview(frame).cast('B')
+
+        # stderr goes to a file: a pipe nobody reads while frames are decoded
+        # fills up on noisy streams and blocks ffmpeg
+        stderr_file = tempfile.TemporaryFile()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr_file)
+
+        try:
+            tolerance = 0.5 / output_fps if output_fps else 0
+            next_sample_times = self._initial_sample_times()
+            last_progress = 0
+            frame_index = 0
+
+            while _read_exactly(process.stdout, frame_bytes):
+                timestamp = self.start_time + (frame_index / output_fps if output_fps else 0)
+                frame_index += 1
+
+                # Frames are only valid during process(), the buffer is reused
+                prepared = {}
+                due = self._due_consumers(timestamp, tolerance, next_sample_times)
+                for consumer, inference_size, crops_full_frame in due:
+                    if inference_size not in prepared:
+                        prepared[inference_size] = downscale_frame(frame, inference_size)
+                    if crops_full_frame:
+                        consumer.process(prepared[inference_size], timestamp, FullFrame(frame, bgr=False))
+                    else:
+                        consumer.process(prepared[inference_size], timestamp)
+
+                # Report progress roughly once per second of video
+                if progress_callback and timestamp - last_progress >= 1.0:
+                    last_progress = timestamp
+                    progress_callback(min(1.0, (timestamp - self.start_time) / segment_length))
+
+            process.wait()
+            if process.returncode != 0 and frame_index == 0:
+                stderr_file.seek(0)
+                error = stderr_file.read().decode('utf-8', errors='replace').strip()
+                raise Exception(f"No se pudo decodificar el video: {error}")
+
+            return info
+
+        finally:
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            stderr_file.close()
+
+
+class FullFrame:
+    def __init__(self, frame, bgr):
+        """Full resolution pixels of the frame being dispatched, as decoded
+
+        Consumers crop small regions of it, so only those regions are scaled
+        and converted to RGB. Like the frames themselves, it is only valid
+        during ``process()``.
+        """
+        self.frame = frame
+        self.bgr = bgr
+        self.shape = frame.shape
+
+    def crop(self, x, y, width, height, size=None):
+        """RGB region of the frame, scaled to ``size`` (width, height) when given"""
+        region = self.frame[y:y + height, x:x + width]
+
+        if size is not None and tuple(size) != region.shape[1::-1]:
+            interpolation = cv2.INTER_LINEAR if size[0] > region.shape[1] else cv2.INTER_AREA
+            region = cv2.resize(region, tuple(size), interpolation=interpolation)
+
+        if self.bgr:
+            return cv2.cvtColor(region, cv2.COLOR_BGR2RGB)
+        return np.ascontiguousarray(region)
+
+
+def open_frame_source(video_path, start_time=0, end_time=None):
+    """Create the frame source selected for this deployment"""
+    if settings.FRAME_SOURCE_BACKEND == 'ffmpeg' and ffmpeg_available():
+        return FFmpegFrameSource(video_path, start_time, end_time)
+    return FrameSource(video_path, start_time, end_time)
+
+
+def scaled_size(width, height, max_size=0):
+    """Size of a frame whose longest side is limited to ``max_size``"""
+    if max_size and max(height, width) > max_size:
+        scale = max_size / max(height, width)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+    return width, height
+
+
+def downscale_frame(frame, max_size=0):
+    """Downscale a frame so its longest side is at most ``max_size``"""
+    height, width = frame.shape[:2]
+    size = scaled_size(width, height, max_size)
+
+    if size != (width, height):
+        frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    return frame
+
+
+def prepare_frame(frame, max_size=0):
+    """Downscale a BGR frame to ``max_size`` (longest side) and convert it to RGB"""
+    # Resizing first means the colour conversion runs on the small image
+    return cv2.cvtColor(downscale_frame(frame, max_size), cv2.COLOR_BGR2RGB)
+
+
+def _read_exactly(stream, buffer):
+    """Fill ``buffer`` from ``stream``, returning False at the end of the stream"""
+    filled = 0
+    while filled < len(buffer):
+        count = stream.readinto(buffer[filled:])
+        if not count:
+            return False
+        filled += count
+    return True
+
+
+def connect_consumers(consumers):
+    """Let consumers build on the results of the consumers registered before them
+
+    Frames are dispatched in registration order, so a consumer with a
+    ``connect(previous)`` method can read what the previous consumers found
+    in the same frame.
+    """
+    for i, consumer in enumerate(consumers):
+        connect = getattr(consumer, 'connect', None)
+        if connect is not None:
+            connect(consumers[:i])
+
+
+def run_frame_analyzers(video_path, analyzers, progress_callback=None):
+    """Run several frame analyzers over a single decode of the video
+
+    Decoding errors become the error results of every analyzer, while an
+    exception raised by ``progress_callback`` (e.g. a cancelled job) stops
+    the decode and propagates.
+    """
+    consumers = [analyzer.create_consumer() for analyzer in analyzers]
+    connect_consumers(consumers)
+    callback_errors = []
+
+    def report(fraction):
+        try:
+            progress_callback(fraction)
+        except Exception as e:
+            callback_errors.append(e)
+            raise
+
+    try:
+        source = open_frame_source(video_path)
+        for consumer in consumers:
+            source.register(consumer)
+        source.run(report if progress_callback else None)
+    except Exception as e:
+        if callback_errors:
+            raise
+        return [consumer.fail(e) for consumer in consumers]
+
+    return [consumer.finish() for consumer in consumers]
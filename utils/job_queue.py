@@ -0,0 +1,331 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from config import settings
+from utils.analysis_cache import json_default
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'            # Finished by a worker, waiting for the collector
+FAILED = 'failed'
+COLLECTED = 'collected'  # Results delivered to the on_done callback
+CANCELLED = 'cancelled'
+
+FINISHED_STATUSES = (FAILED, COLLECTED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised by the progress callback of a job that was cancelled while running"""
+
+
+def _connect(db_path):
+    """Open the job database; transactions are started explicitly"""
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+def _row_to_job(row):
+    """Convert a database row to a job dict"""
+    job = dict(row)
+    for field in ('payload', 'progress', 'result'):
+        job[field] = json.loads(job[field]) if job[field] else None
+    return job
+
+
+def _now():
+    """Current time as stored in the job database"""
+    return datetime.now().isoformat()
+
+
+class JobQueue:
+    def __init__(self, handler, db_path=None, workers=None, on_done=None, worker_exit=None):
+        """Create the job database and start the worker processes
+
+        ``handler(payload, progress_callback)`` runs in the workers and returns
+        the job result, ``worker_exit()`` releases its resources when a worker
+        stops. ``on_done(job)`` runs in this process for every finished job,
+        so results have a single writer.
+        """
+        self.db_path = db_path or settings.JOB_QUEUE_DB
+        self.on_done = on_done
+        self.poll_seconds = settings.JOB_POLL_SECONDS
+
+        db_dir = os.path.dirname(self.db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._init_db()
+
+        # Spawned workers keep MediaPipe and Whisper out of the Streamlit process
+        context = multiprocessing.get_context('spawn')
+        self.stop_event = context.Event()
+        self.workers = [
+            context.Process(
+                target=_worker_main,
+                args=(handler, worker_exit, self.db_path, os.getpid(), self.stop_event, self.poll_seconds),
+                name=f"analysis-worker-{i}"
+            )
+            for i in range(max(1, workers or settings.JOB_WORKERS))
+        ]
+        for worker in self.workers:
+            worker.start()
+
+        self._stop = threading.Event()
+        self._collector = threading.Thread(target=self._collect_loop, name='job-collector', daemon=True)
+        self._collector.start()
+
+    def _init_db(self):
+        """Create the jobs table and recover the jobs of a previous run"""
+        conn = _connect(self.db_path)
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    progress TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    worker_pid INTEGER
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)')
+
+            # Databases created before jobs recorded their worker
+            columns = [row['name'] for row in conn.execute('PRAGMA table_info(jobs)')]
+            if 'worker_pid' not in columns:
+                conn.execute('ALTER TABLE jobs ADD COLUMN worker_pid INTEGER')
+
+            # Run again the jobs whose worker died with them; the workers of another
+            # queue on the same database (e.g. a reloaded app) may still be running theirs
+            multiprocessing.active_children()  # Reap exited workers of this process
+            for row in conn.execute('SELECT id, worker_pid FROM jobs WHERE status = ?', (RUNNING,)).fetchall():
+                if not row['worker_pid'] or not _process_alive(row['worker_pid']):
+                    conn.execute(
+                        'UPDATE jobs SET status = ?, started_at = NULL, worker_pid = NULL WHERE id = ? AND status = ?',
+                        (QUEUED, row['id'], RUNNING)
+                    )
+
+            retention_limit = (datetime.now() - timedelta(hours=settings.JOB_RETENTION_HOURS)).isoformat()
+            conn.execute(
+                f'DELETE FROM jobs WHERE status IN ({",".join("?" * len(FINISHED_STATUSES))}) AND finished_at < ?',
+                (*FINISHED_STATUSES, retention_limit)
+            )
+        finally:
+            conn.close()
+
+    def enqueue(self, payload):
+        """Add a job to the queue and return its id"""
+        job_id = uuid.uuid4().hex
+        conn = _connect(self.db_path)
+        try:
+            conn.execute(
+                'INSERT INTO jobs (id, status, payload, created_at) VALUES (?, ?, ?, ?)',
+                (job_id, QUEUED, json.dumps(payload, ensure_ascii=False, default=json_default), _now())
+            )
+        finally:
+            conn.close()
+        return job_id
+
+    def get(self, job_id):
+        """Return a job, or None if it does not exist"""
+        conn = _connect(self.db_path)
+        try:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return _row_to_job(row) if row else None
+
+    def position(self, job_id):
+        """Number of queued jobs ahead of ``job_id``"""
+        conn = _connect(self.db_path)
+        try:
+            row = conn.execute(
+                'SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < '
+                '(SELECT created_at FROM jobs WHERE id = ?)',
+                (QUEUED, job_id)
+            ).fetchone()
+        finally:
+            conn.close()
+        return row[0]
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job and return the status it had, or None if it had finished
+
+        Running jobs stop at their next progress report; queued jobs never start.
+        """
+        conn = _connect(self.db_path)
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            previous = row['status'] if row and row['status'] in (QUEUED, RUNNING) else None
+            if previous:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?', (CANCELLED, _now(), job_id)
+                )
+            conn.execute('COMMIT')
+        finally:
+            conn.close()
+        return previous
+
+    def _collect_loop(self):
+        """Deliver the results of finished jobs to the on_done callback"""
+        conn = _connect(self.db_path)
+        try:
+            while not self._stop.wait(self.poll_seconds):
+                rows = conn.execute('SELECT * FROM jobs WHERE status = ? ORDER BY finished_at', (DONE,)).fetchall()
+                for row in rows:
+                    job = _row_to_job(row)
+
+                    # Claim the job first: another queue on the same database may be collecting too
+                    cursor = conn.execute(
+                        'UPDATE jobs SET status = ? WHERE id = ? AND status = ?', (COLLECTED, job['id'], DONE)
+                    )
+                    if cursor.rowcount == 0:
+                        continue
+
+                    try:
+                        if self.on_done:
+                            self.on_done(job)
+                    except Exception as e:
+                        print(f"Error collecting job {job['id']}: {e}")
+                        conn.execute(
+                            'UPDATE jobs SET status = ?, error = ? WHERE id = ?',
+                            (FAILED, str(e), job['id'])
+                        )
+        finally:
+            conn.close()
+
+    def shutdown(self, timeout=10):
+        """Stop the collector and the worker processes"""
+        self._stop.set()
+
+        # Workers finish their current job and exit cleanly, releasing their own process pools
+        self.stop_event.set()
+        for worker in self.workers:
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+
+
+def _worker_main(handler, worker_exit, db_path, parent_pid, stop_event, poll_seconds):
+    """Worker process: claim queued jobs and run them until stopped or the parent exits"""
+    conn = _connect(db_path)
+
+    try:
+        while not stop_event.is_set() and os.getppid() == parent_pid:
+            job = _claim_job(conn)
+            if job is None:
+                stop_event.wait(poll_seconds)
+                continue
+
+            # Only running jobs are updated, so a cancellation is never overwritten
+            reporter = _ProgressReporter(conn, job['id'])
+            try:
+                result = handler(job['payload'], reporter)
+                conn.execute(
+                    'UPDATE jobs SET status = ?, result = ?, finished_at = ? WHERE id = ? AND status = ?',
+                    (DONE, json.dumps(result, ensure_ascii=False, default=json_default), _now(), job['id'], RUNNING)
+                )
+            except JobCancelled:
+                pass
+            except Exception as e:
+                conn.execute(
+                    'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ?',
+                    (FAILED, str(e), _now(), job['id'], RUNNING)
+                )
+    finally:
+        # Multiprocessing children skip atexit handlers, so process pools must be stopped here
+        if worker_exit:
+            worker_exit()
+        conn.close()
+
+
+def _claim_job(conn):
+    """Atomically move the oldest queued job to running"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        row = conn.execute(
+            'SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1', (QUEUED,)
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                'UPDATE jobs SET status = ?, started_at = ?, worker_pid = ? WHERE id = ?',
+                (RUNNING, _now(), os.getpid(), row['id'])
+            )
+        conn.execute('COMMIT')
+    except Exception:
+        conn.execute('ROLLBACK')
+        raise
+
+    return _row_to_job(row) if row else None
+
+
+def _process_alive(pid):
+    """Whether a process with this id is running"""
+    if os.name == 'nt':
+        # os.kill() would terminate the process on Windows
+        import ctypes
+
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class _ProgressReporter:
+    def __init__(self, conn, job_id, min_interval=0.5):
+        """Write the progress of a running job, throttled to limit database writes"""
+        self.conn = conn
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self.last_write = 0.0
+        self.last_stage = None
+        self.last_partial = None
+
+    def __call__(self, progress):
+        """Store a progress dict, raising JobCancelled if the job is no longer running
+
+        Stage changes and new partial results are always written.
+        """
+        now = time.monotonic()
+        stage = progress.get('stage')
+        partial = progress.get('partial')
+        if stage == self.last_stage and partial == self.last_partial and now - self.last_write < self.min_interval:
+            return
+
+        cursor = self.conn.execute(
+            'UPDATE jobs SET progress = ? WHERE id = ? AND status = ?',
+            (json.dumps(progress, default=json_default), self.job_id, RUNNING)
+        )
+        if cursor.rowcount == 0:
+            raise JobCancelled(self.job_id)
+
+        self.last_write = now
+        self.last_stage = stage
+        self.last_partial = partial
@@ -0,0 +1,79 @@
+import cv2
+import numpy as np
+
+from config import settings
+
+# Longest side (pixels) of the grayscale thumbnail compared between frames
+THUMBNAIL_SIZE = 64
+
+# The thumbnail difference is averaged over a GRID x GRID grid of cells and the
+# busiest cell decides, so a moving hand in a wide shot is not diluted by the
+# static background
+GRID = 8
+
+
+class MotionScheduler:
+    def __init__(self, static_interval=None, threshold=None):
+        """Decide which sampled frames need a new MediaPipe inference
+
+        Every sampled frame is compared on a tiny grayscale thumbnail with
+        the frame of the last inference. While the picture moves more than
+        ``threshold`` gray levels (0-255) in some region, every sampled frame
+        is inferred; while it stays still, only one frame every
+        ``static_interval`` seconds is, and the consumer reuses the last
+        landmarks in between.
+        """
+        if static_interval is None:
+            static_interval = 1.0 / settings.ADAPTIVE_STATIC_FPS if settings.ADAPTIVE_STATIC_FPS > 0 else 0
+        self.static_interval = static_interval
+        self.threshold = settings.ADAPTIVE_MOTION_THRESHOLD if threshold is None else threshold
+
+        self.reference = None
+        self.last_inference = None
+        self.inferences = 0
+        self.reused = 0
+
+    def should_infer(self, frame, timestamp):
+        """Whether the frame at ``timestamp`` needs an inference, False to reuse the last one"""
+        thumbnail = self._thumbnail(frame)
+
+        infer = (
+            self.reference is None
+            or self.reference.shape != thumbnail.shape
+            or timestamp - self.last_inference >= self.static_interval
+            or self._motion(thumbnail) > self.threshold
+        )
+
+        if infer:
+            self.reference = thumbnail
+            self.last_inference = timestamp
+            self.inferences += 1
+        else:
+            self.reused += 1
+
+        return infer
+
+    def _thumbnail(self, frame):
+        """Grayscale thumbnail of an RGB frame"""
+        height, width = frame.shape[:2]
+        scale = THUMBNAIL_SIZE / max(height, width)
+        size = (max(GRID, round(width * scale)), max(GRID, round(height * scale)))
+        return cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_RGB2GRAY)
+
+    def _motion(self, thumbnail):
+        """Mean gray level change of the busiest cell since the last inference"""
+        difference = cv2.absdiff(thumbnail, self.reference)
+        cells = cv2.resize(difference.astype(np.float32), (GRID, GRID), interpolation=cv2.INTER_AREA)
+        return float(cells.max())
+
+
+def create_motion_scheduler():
+    """Scheduler for one consumer, or None when adaptive sampling is disabled"""
+    return MotionScheduler() if settings.ADAPTIVE_SAMPLING else None
+
+
+def adaptive_cache_key():
+    """Adaptive sampling settings that change the analysis results"""
+    if not settings.ADAPTIVE_SAMPLING:
+        return "fixed"
+    return f"adaptive{settings.ADAPTIVE_MOTION_THRESHOLD}-static{settings.ADAPTIVE_STATIC_FPS}"
@@ -0,0 +1,67 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+from config import settings
+
+# Copy buffers of the uploads being spooled at the same time stay under the memory ceiling
+_spool_slots = threading.BoundedSemaphore(
+    max(1, settings.UPLOAD_SPOOL_MEMORY_MB // settings.UPLOAD_CHUNK_SIZE_MB)
+)
+
+
+def upload_extension(uploaded_file, default='.mp4'):
+    """Real extension of an uploaded file, so format checks see the true container"""
+    ext = os.path.splitext(getattr(uploaded_file, 'name', '') or '')[1].lower()
+    return ext or default
+
+
+def spool_upload(uploaded_file, scratch_dir=None, chunk_size=None):
+    """Stream an upload to the scratch directory in fixed-size chunks
+
+    Returns the path of the spooled file and the SHA-256 of its bytes,
+    computed while copying so the file does not need to be read again.
+    """
+    scratch_dir = scratch_dir or settings.UPLOAD_SCRATCH_DIR
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_SIZE_MB * 1024 * 1024
+    os.makedirs(scratch_dir, exist_ok=True)
+
+    if hasattr(uploaded_file, 'seek'):
+        uploaded_file.seek(0)
+
+    digest = hashlib.sha256()
+
+    with _spool_slots:
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+
+        tmp_file = tempfile.NamedTemporaryFile(
+            dir=scratch_dir, prefix='upload_', suffix=upload_extension(uploaded_file), delete=False
+        )
+        try:
+            with tmp_file:
+                while True:
+                    size = _read_chunk(uploaded_file, view)
+                    if not size:
+                        break
+                    digest.update(view[:size])
+                    tmp_file.write(view[:size])
+        except Exception:
+            # Never leave partial uploads behind in the scratch directory
+            os.unlink(tmp_file.name)
+            raise
+        finally:
+            view.release()
+
+    return tmp_file.name, digest.hexdigest()
+
+
+def _read_chunk(stream, view):
+    """Read the next chunk into the reusable buffer, returning its size"""
+    if hasattr(stream, 'readinto'):
+        return stream.readinto(view)
+
+    data = stream.read(len(view))
+    view[:len(data)] = data
+    return len(data)
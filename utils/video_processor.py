@@ -1,7 +1,21 @@
 import cv2
 import os
+import subprocess
 import tempfile
 import numpy as np
+from config import settings
+from utils.ffmpeg_tools import ffmpeg_available, passthrough_args, probe_video
+from utils.frame_source import downscale_frame, scaled_size
+
+# Face detector shared by every validation in the process
+_face_cascade = None
+
+def get_face_cascade():
+    """Load the Haar face cascade once per process"""
+    global _face_cascade
+    if _face_cascade is None:
+        _face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    return _face_cascade
 
 class VideoProcessor:
     def __init__(self):
@@ -9,6 +23,21 @@ class VideoProcessor:
         self.supported_formats = ['.mp4', '.avi', '.mov', '.mkv']
         self.max_duration = 600  # 10 minutes max
         self.min_duration = 10   # 10 seconds min
+        self.quality_samples = 10
+        self.quality_frame_size = settings.VALIDATION_FRAME_SIZE  # Longest side for quality checks
+        self.face_frame_size = settings.VALIDATION_FACE_SIZE  # Longest side for face detection, 0 = full
+    
+    def cache_key(self):
+        """Limits and settings that determine the validation results"""
+        return (f"video-{self.min_duration}-{self.max_duration}-{self.quality_samples}-"
+                f"{self.quality_frame_size}-face{self.face_frame_size}-"
+                f"{'fast' if settings.FAST_VIDEO_VALIDATION else 'full'}")
+    
+    def _sample_frame_size(self):
+        """Longest side of the sampled frames, large enough for both the metrics and face detection"""
+        if not self.face_frame_size:
+            return 0
+        return max(self.quality_frame_size, self.face_frame_size)
     
     def process_video(self, video_path):
         """Process and validate video file"""
@@ -28,6 +57,10 @@ class VideoProcessor:
                     'error': f'Formato no soportado. Use: {", ".join(self.supported_formats)}'
                 }
             
+            # Fast mode: container metadata plus a few low resolution keyframes
+            if settings.FAST_VIDEO_VALIDATION and ffmpeg_available():
+                return self._process_video_fast(video_path)
+            
             # Open video file
             cap = cv2.VideoCapture(video_path)
             
@@ -46,30 +79,14 @@ class VideoProcessor:
             # Calculate duration
             duration = frame_count / fps if fps > 0 else 0
             
-            cap.release()
+            property_error = self._validate_properties(duration, width, height)
+            if property_error:
+                cap.release()
+                return property_error
             
-            # Validate duration
-            if duration < self.min_duration:
-                return {
-                    'success': False,
-                    'error': f'El video es muy corto. Mínimo {self.min_duration} segundos'
-                }
-            
-            if duration > self.max_duration:
-                return {
-                    'success': False,
-                    'error': f'El video es muy largo. Máximo {self.max_duration/60:.1f} minutos'
-                }
-            
-            # Check resolution
-            if width < 320 or height < 240:
-                return {
-                    'success': False,
-                    'error': 'Resolución muy baja. Mínimo 320x240'
-                }
-            
-            # Validate that video has content
-            quality_check = self._check_video_quality(video_path)
+            # Validate that video has content, reusing the already open capture
+            quality_check = self._check_video_quality(video_path, cap)
+            cap.release()
             if not quality_check['success']:
                 return quality_check
             
@@ -89,10 +106,103 @@ class VideoProcessor:
                 'error': f'Error procesando video: {str(e)}'
             }
     
-    def _check_video_quality(self, video_path):
+    def _process_video_fast(self, video_path):
+        """Validate using ffprobe metadata and low resolution keyframes only"""
+        try:
+            info = probe_video(video_path)
+        except Exception:
+            return {
+                'success': False,
+                'error': 'No se pudo abrir el archivo de video'
+            }
+        
+        property_error = self._validate_properties(info['duration'], info['width'], info['height'])
+        if property_error:
+            return property_error
+        
+        try:
+            gray_frames = self._sample_keyframes(video_path, info)
+        except Exception:
+            gray_frames = []
+        
+        if gray_frames:
+            quality_check = self._evaluate_quality(gray_frames)
+        else:
+            # ffmpeg could not decode the keyframes, sample the frames with OpenCV instead
+            quality_check = self._check_video_quality(video_path)
+        
+        if not quality_check['success']:
+            return quality_check
+        
+        return {
+            'success': True,
+            'duration': info['duration'],
+            'fps': info['fps'],
+            'frame_count': info['total_frames'],
+            'resolution': (info['width'], info['height']),
+            'file_size': os.path.getsize(video_path),
+            'quality_metrics': quality_check['metrics']
+        }
+    
+    def _validate_properties(self, duration, width, height):
+        """Check duration and resolution, returning an error result if invalid"""
+        
+        # Validate duration
+        if duration < self.min_duration:
+            return {
+                'success': False,
+                'error': f'El video es muy corto. Mínimo {self.min_duration} segundos'
+            }
+        
+        if duration > self.max_duration:
+            return {
+                'success': False,
+                'error': f'El video es muy largo. Máximo {self.max_duration/60:.1f} minutos'
+            }
+        
+        # Check resolution
+        if width < 320 or height < 240:
+            return {
+                'success': False,
+                'error': 'Resolución muy baja. Mínimo 320x240'
+            }
+        
+        return None
+    
+    def _sample_keyframes(self, video_path, info):
+        """Decode about ``quality_samples`` evenly spaced keyframes as grayscale images"""
+        width, height = scaled_size(info['width'], info['height'], self._sample_frame_size())
+        
+        # Only keyframes are decoded; select keeps one every interval seconds
+        interval = info['duration'] / self.quality_samples if info['duration'] > 0 else 0
+        select = f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{interval:.3f})'"
+        
+        result = subprocess.run(
+            [
+                'ffmpeg', '-v', 'error', '-nostdin',
+                '-skip_frame', 'nokey',
+                '-i', video_path,
+                '-an', '-sn',
+                '-vf', f'{select},scale={width}:{height}:flags=area',
+                *passthrough_args(),
+                '-frames:v', str(self.quality_samples),
+                '-f', 'rawvideo', '-pix_fmt', 'gray',
+                'pipe:1'
+            ],
+            capture_output=True, check=True
+        )
+        
+        frame_size = width * height
+        count = len(result.stdout) // frame_size
+        frames = np.frombuffer(result.stdout[:count * frame_size], dtype=np.uint8)
+        return list(frames.reshape(count, height, width))
+    
+    def _check_video_quality(self, video_path, cap=None):
         """Check video quality and detect issues"""
         try:
-            cap = cv2.VideoCapture(video_path)
+            owns_capture = cap is None
+            if owns_capture:
+                cap = cv2.VideoCapture(video_path)
             
             if not cap.isOpened():
                 return {
@@ -102,27 +212,51 @@ class VideoProcessor:
             
             # Sample frames throughout the video
             frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-            sample_points = np.linspace(0, frame_count - 1, min(10, frame_count), dtype=int)
+            sample_points = np.linspace(0, frame_count - 1, min(self.quality_samples, frame_count), dtype=int)
+            
+            gray_frames = []
+            for frame_idx in sample_points:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+                ret, frame = cap.read()
+                
+                if not ret:
+                    continue
+                
+                # Quality checks only need a grayscale version of the frame
+                frame = downscale_frame(frame, self._sample_frame_size())
+                gray_frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+            
+            if owns_capture:
+                cap.release()
+            
+            return self._evaluate_quality(gray_frames)
             
+        except Exception as e:
+            return {
+                'success': False,
+                'error': f'Error verificando calidad: {str(e)}'
+            }
+    
+    def _evaluate_quality(self, gray_frames):
+        """Compute quality metrics from the sampled grayscale frames that could be decoded"""
+        try:
             brightness_values = []
             contrast_values = []
             motion_values = []
             face_detection_count = 0
             
-            # Initialize face detector
-            face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+            face_cascade = get_face_cascade()
             
             prev_frame = None
             
-            for frame_idx in sample_points:
-                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-                ret, frame = cap.read()
-                
-                if not ret:
-                    continue
+            for frame in gray_frames:
+                # The cascade misses faces under 24 px, so they are searched on larger
+                # frames than the other metrics need
+                faces = face_cascade.detectMultiScale(downscale_frame(frame, self.face_frame_size), 1.1, 4)
+                if len(faces) > 0:
+                    face_detection_count += 1
                 
-                # Convert to grayscale for analysis
-                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                gray = downscale_frame(frame, self.quality_frame_size)
                 
                 # Calculate brightness
                 brightness = np.mean(gray)
@@ -132,11 +266,6 @@ class VideoProcessor:
                 contrast = np.std(gray)
                 contrast_values.append(contrast)
                 
-                # Detect faces
-                faces = face_cascade.detectMultiScale(gray, 1.1, 4)
-                if len(faces) > 0:
-                    face_detection_count += 1
-                
                 # Calculate motion (if not first frame)
                 if prev_frame is not None:
                     motion = np.mean(np.abs(gray.astype(float) - prev_frame.astype(float)))
@@ -144,13 +273,11 @@ class VideoProcessor:
                 
                 prev_frame = gray
             
-            cap.release()
-            
             # Analyze quality metrics
             avg_brightness = np.mean(brightness_values) if brightness_values else 0
             avg_contrast = np.mean(contrast_values) if contrast_values else 0
             avg_motion = np.mean(motion_values) if motion_values else 0
-            face_detection_rate = face_detection_count / len(sample_points) if sample_points.size > 0 else 0
+            face_detection_rate = face_detection_count / len(gray_frames) if gray_frames else 0
             
             # Check quality thresholds
             issues = []
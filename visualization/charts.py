@@ -230,6 +230,91 @@ class ChartGenerator:
         plt.tight_layout()
         return fig
     
+    def create_pitch_timeline(self, pitch_data):
+        """Create timeline of voice pitch (intonation)"""
+        fig, ax = plt.subplots(figsize=(12, 6))
+        
+        times = [point['time'] for point in pitch_data]
+        pitches = [point['pitch'] for point in pitch_data]
+        
+        # Plot pitch contour
+        ax.plot(times, pitches, 'o-', linewidth=1.5, markersize=3, color='#9467bd', alpha=0.8,
+               label='Tono (Hz)')
+        
+        # Mark the average pitch as reference for the intonation range
+        if pitches:
+            mean_pitch = np.mean(pitches)
+            ax.axhline(mean_pitch, linestyle='--', linewidth=2, color='gray',
+                      label=f'Tono Promedio ({mean_pitch:.0f} Hz)')
+        
+        ax.set_xlabel('Tiempo (segundos)')
+        ax.set_ylabel('Frecuencia Fundamental (Hz)')
+        ax.set_title('Entonación a lo Largo del Tiempo', fontweight='bold')
+        ax.grid(True, alpha=0.3)
+
+        ax.legend(loc='best', framealpha=0.9)
+
+        plt.tight_layout()
+        return fig
+
+    def create_speech_rate_timeline(self, rate_data, filler_data):
+        """Create timeline of speaking rate with the moments fillers were used"""
+        fig, ax = plt.subplots(figsize=(12, 6))
+
+        times = [point['time'] for point in rate_data]
+        rates = [point['rate'] for point in rate_data]
+
+        # Plot words per minute of every interval as one bar
+        interval = times[1] - times[0] if len(times) > 1 else 60
+        ax.bar(times, rates, width=interval, align='edge', color='#1f77b4', alpha=0.7,
+              edgecolor='white', label='Palabras por Minuto')
+
+        # Ideal speaking rate band
+        ax.axhspan(120, 160, alpha=0.1, color='green', label='Ritmo Ideal')
+
+        # Mark every filler along the bottom of the chart
+        filler_times = [point['time'] for point in filler_data]
+        if filler_times:
+            ax.scatter(filler_times, [0.03] * len(filler_times), marker='|', s=200,
+                      transform=ax.get_xaxis_transform(), color='#d62728',
+                      label=f'Muletillas ({len(filler_times)})', zorder=5)
+
+        ax.set_xlabel('Tiempo (segundos)')
+        ax.set_ylabel('Palabras por Minuto')
+        ax.set_title('Ritmo del Habla a lo Largo del Tiempo', fontweight='bold')
+        ax.set_ylim(bottom=0)
+        ax.grid(True, alpha=0.3)
+
+        ax.legend(loc='best', framealpha=0.9)
+
+        plt.tight_layout()
+        return fig
+
+    def create_pause_histogram(self, pause_data):
+        """Create histogram of pause lengths between words"""
+        fig, ax = plt.subplots(figsize=(10, 6))
+
+        labels = [
+            f"{point['min']:g}-{point['max']:g} s" if point['max'] is not None else f"> {point['min']:g} s"
+            for point in pause_data
+        ]
+        counts = [point['count'] for point in pause_data]
+
+        bars = ax.bar(labels, counts, color='#17becf', alpha=0.8, edgecolor='black', linewidth=1)
+
+        # Add count labels on bars
+        for bar, count in zip(bars, counts):
+            ax.text(bar.get_x() + bar.get_width()/2., bar.get_height(),
+                   f'{count}', ha='center', va='bottom', fontweight='bold')
+
+        ax.set_xlabel('Duración de la Pausa')
+        ax.set_ylabel('Número de Pausas')
+        ax.set_title('Distribución de Pausas', fontweight='bold')
+        ax.grid(True, alpha=0.3, axis='y')
+
+        plt.tight_layout()
+        return fig
+
     def create_movement_timeline(self, movement_data):
         """Create timeline of body movement activity"""
         fig, ax = plt.subplots(figsize=(12, 6))